@@ -1,3 +1,4 @@
+import asyncio
 import sys
 
 from fastapi import FastAPI
@@ -5,14 +6,25 @@ from loguru import logger
 from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.trustedhost import TrustedHostMiddleware
 
+from configs.Broker import broker
+from configs.Database import async_session
 from configs.Environment import get_environment_variables
+from configs.Matching import matcher
+from configs.Minio import minio_client, minio_executor, url_signer
 from errors.handlers import init_exception_handlers
+from repositories.minio import MinioRepository
+from repositories.personality_model import PersonalityModelRepository
 
 from routing.v1.auth import router as auth_router
 from routing.v1.metric import router as metric_router
 from routing.v1.card import router as card_router
 from routing.v1.vacancy import router as vacancy_router
 from routing.v1.personality_model import router as personality_model_router
+from services.matching import MatchingService
+from services.minio import MinioService
+from services.ml import ml_executor
+from utils.pagination import NEXT_CURSOR_HEADER
+from workers.card import run_worker
 
 app = FastAPI(openapi_url="/api/v1/openapi.json", docs_url="/api/v1/core/docs")
 
@@ -22,6 +34,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])
@@ -39,3 +52,56 @@ app.include_router(metric_router)
 app.include_router(card_router)
 app.include_router(vacancy_router)
 app.include_router(personality_model_router)
+
+
+@app.on_event("startup")
+async def create_buckets():
+    # бакет проверяется один раз при старте, а не в каждом запросе
+    minio = MinioService(
+        MinioRepository(minio_client, url_signer, minio_executor), env
+    )
+    await minio.create_base_bucket()
+
+
+async def _load_matching_index():
+    async with async_session() as db:
+        await MatchingService(PersonalityModelRepository(db), matcher, env).sync(
+            force=True
+        )
+    logger.info(
+        f"Matching - index loaded: {len(matcher.cards)} cards, {len(matcher.vacancies)} vacancies"
+    )
+
+
+@app.on_event("startup")
+async def load_matching_index():
+    # полная загрузка индекса идёт в фоне, чтобы не задерживать старт API
+    app.state.matching = asyncio.create_task(_load_matching_index())
+
+
+@app.on_event("startup")
+async def start_ml_executor():
+    # пул поднимается в фоне: первые запросы к моделям дождутся его готовности
+    app.state.ml_executor = asyncio.get_running_loop().run_in_executor(
+        None, ml_executor.start, env.ML_PRELOAD
+    )
+    app.state.ml_executor.add_done_callback(_log_ml_executor_start)
+
+
+def _log_ml_executor_start(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.opt(exception=future.exception()).error("ML - executor failed to start")
+
+
+@app.on_event("shutdown")
+async def stop_ml_executor():
+    ml_executor.shutdown()
+
+
+@app.on_event("startup")
+async def start_in_process_workers():
+    # брокер в памяти не виден отдельным процессам, поэтому воркеры живут в API
+    if broker.in_process:
+        app.state.workers = [
+            asyncio.create_task(run_worker()) for _ in range(env.CARD_WORKERS)
+        ]
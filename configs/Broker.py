@@ -0,0 +1,10 @@
+from configs.Environment import get_environment_variables
+from workers.broker import Broker, create_broker
+
+env = get_environment_variables()
+
+broker = create_broker(env.BROKER_URL)
+
+
+def get_broker() -> Broker:
+    yield broker
@@ -14,9 +14,52 @@ class EnvironmentSettings(BaseSettings):
     MINIO_SECRET: str
     MINIO_HOST: str
     MINIO_BASE_BUCKET: str
+    MINIO_REGION: str = "us-east-1"
+    MINIO_PART_SIZE_MB: int = 8
+    UPLOAD_MEMORY_LIMIT_MB: int = 32
+    MINIO_MAX_WORKERS: int = 16
+    MINIO_MAX_CONNECTIONS: int = 64
 
     SECRET_KEY: str
 
+    BROKER_URL: str = "sqlite:///broker.sqlite3"
+    CARD_WORKERS: int = 1
+    CARD_WORKER_CONCURRENCY: int = 4
+
+    ML_MODELS: list[str] = ["whisper", "imagebind", "rugpt", "catboost"]
+    ML_PRELOAD: bool = False
+    ML_PROCESSES: int = 0
+    INFERENCE_PRECISION: str = "fp32"
+    ML_BACKEND: str = "torch"
+    ML_INTRA_OP_THREADS: int = 0
+    IMAGEBIND_EXPORT_DIR: str = "ml/models/imagebind"
+
+    WHISPER_BATCH_SIZE: int = 8
+    WHISPER_VAD: bool = True
+
+    IMAGEBIND_MODALITIES: list[str] = ["audio", "text"]
+    IMAGEBIND_CHECKPOINT: str = ".checkpoints/imagebind_huge.pth"
+    IMAGEBIND_BATCH_SIZE: int = 8
+    IMAGEBIND_BATCH_WINDOW_MS: int = 10
+
+    ADVICE_MAX_NEW_TOKENS: int = 100
+    ADVICE_BATCH_SIZE: int = 4
+    ADVICE_BATCH_WINDOW_MS: int = 50
+
+    VIDEO_FPS: float = 0.5
+    VIDEO_MAX_FRAMES: int = 16
+    VIDEO_KEYFRAMES: bool = False
+
+    PERSONALITY_STATISTICS_UPDATE: bool = False
+    PERSONALITY_STATISTICS_PATH: str = "ml/models/personality_statistics.json"
+
+    MATCHING_SYNC_INTERVAL_S: float = 5.0
+    MATCHING_METRIC: str = "distance"
+
+    EMBEDDING_CACHE_DIR: str = "cache/embeddings"
+    EMBEDDING_CACHE_MEMORY_MB: int = 256
+    EMBEDDING_CACHE_DISK_MB: int = 4096
+
     DEBUG: bool
 
     class Config:
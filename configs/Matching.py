@@ -0,0 +1,8 @@
+from ml.constants import MATCHING_TRAITS
+from ml.matching import OceanMatcher
+
+matcher = OceanMatcher(MATCHING_TRAITS)
+
+
+def get_matcher() -> OceanMatcher:
+    yield matcher
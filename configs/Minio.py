@@ -1,18 +1,57 @@
+import os
+from concurrent.futures import Executor, ThreadPoolExecutor
+
+import certifi
+import urllib3
 from minio import Minio
 
 from configs.Environment import get_environment_variables
+from utils.presign import PresignedUrlSigner
 
 env = get_environment_variables()
 
 base_bucket = env.MINIO_BASE_BUCKET
 
+# пул соединений рассчитан на все потоки исполнителя и параллельные части загрузок
+http_client = urllib3.PoolManager(
+    maxsize=env.MINIO_MAX_CONNECTIONS,
+    timeout=urllib3.Timeout(connect=5, read=300),
+    retries=urllib3.Retry(
+        total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]
+    ),
+    cert_reqs="CERT_REQUIRED",
+    ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+)
+
 minio_client = Minio(
     env.MINIO_HOST,
     access_key=env.MINIO_ACCESS,
     secret_key=env.MINIO_SECRET,
+    region=env.MINIO_REGION,
+    secure=True,
+    http_client=http_client,
+)
+
+minio_executor = ThreadPoolExecutor(
+    max_workers=env.MINIO_MAX_WORKERS, thread_name_prefix="minio"
+)
+
+url_signer = PresignedUrlSigner(
+    env.MINIO_HOST,
+    access_key=env.MINIO_ACCESS,
+    secret_key=env.MINIO_SECRET,
+    region=env.MINIO_REGION,
     secure=True,
 )
 
 
 def get_minio_client() -> Minio:
     yield minio_client
+
+
+def get_minio_executor() -> Executor:
+    yield minio_executor
+
+
+def get_url_signer() -> PresignedUrlSigner:
+    yield url_signer
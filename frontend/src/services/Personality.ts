@@ -5,6 +5,14 @@ export default class Personality {
         return api.post('/card/', formData, { headers: { 'Content-Type': 'multipart/form-data' } });
     }
 
+    static async getJob(id: string): Promise<any> {
+        return api.get(`/card/job/${id}`);
+    }
+
+    static async getCard(id: string): Promise<any> {
+        return api.get(`/card/${id}`);
+    }
+
     static async getPersonalityList(limit: number, offset: number): Promise<any> {
         return api.get(`/card/`, { params: { limit, offset } } );
     }
@@ -2,6 +2,11 @@
 import AuthService from "../services/AuthService";
 import Personality from "../services/Personality";
 
+// интервал опроса статуса задачи обработки карточки
+const JOB_POLL_INTERVAL_MS = 2000;
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
 export default class Store {
     isAuth = false;
     isLoading = false;
@@ -52,13 +57,26 @@ export default class Store {
     }
     async uploadCandidateData(formData: any){
         try {
+            // POST /card/ возвращает задачу обработки (202), карточка с
+            // результатами запрашивается, когда задача завершится
             const response = await Personality.uploadCandidateData(formData);
-            this.setPersonality(response.data);
-            return response.data;
+            let job = response.data;
+            while (job.status === 'pending' || job.status === 'processing') {
+                await sleep(JOB_POLL_INTERVAL_MS);
+                job = (await Personality.getJob(job.id)).data;
+            }
+            if (job.status !== 'done') {
+                throw new Error(job.error || 'card processing failed');
+            }
+
+            const card = await Personality.getCard(job.card);
+            this.setPersonality(card.data);
+            return card.data;
         } catch(e) {
             console.log('Error upload candidate data', e);
+            throw e;
         }
-}
+    }
     async getPersonalityList(limit: number, offset: number){
         try {
             const response = await Personality.getPersonalityList(limit, offset);
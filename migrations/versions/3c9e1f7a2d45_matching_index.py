@@ -0,0 +1,33 @@
+"""matching_index
+
+Revision ID: 3c9e1f7a2d45
+Revises: f5dcfb3a528b
+Create Date: 2024-11-18 11:47:32.516204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3c9e1f7a2d45"
+down_revision: Union[str, None] = "f5dcfb3a528b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # индекс сопоставления догоняет таблицу по updated_at
+    op.create_index(
+        "ix_personality_model_model_updated_at",
+        "personality_model",
+        ["model", "updated_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_personality_model_model_updated_at", table_name="personality_model"
+    )
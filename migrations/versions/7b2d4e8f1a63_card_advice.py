@@ -0,0 +1,43 @@
+"""card_advice
+
+Revision ID: 7b2d4e8f1a63
+Revises: 3c9e1f7a2d45
+Create Date: 2024-11-18 16:05:41.230917
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7b2d4e8f1a63"
+down_revision: Union[str, None] = "3c9e1f7a2d45"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("card", sa.Column("advice", sa.String(), nullable=True))
+    op.add_column("card", sa.Column("advice_prompt", sa.String(), nullable=True))
+    op.add_column("card", sa.Column("advice_model", sa.String(), nullable=True))
+    op.add_column(
+        "card", sa.Column("advice_generated_at", sa.DateTime(), nullable=True)
+    )
+
+    # существующие задачи — задачи обработки карточек
+    op.add_column(
+        "job",
+        sa.Column("kind", sa.String(), server_default="process", nullable=False),
+    )
+    op.alter_column("job", "kind", server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column("job", "kind")
+    op.drop_column("card", "advice_generated_at")
+    op.drop_column("card", "advice_model")
+    op.drop_column("card", "advice_prompt")
+    op.drop_column("card", "advice")
@@ -0,0 +1,47 @@
+"""keyset_pagination
+
+Revision ID: f5dcfb3a528b
+Revises: be816c4815c4
+Create Date: 2024-11-17 15:22:08.903114
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f5dcfb3a528b"
+down_revision: Union[str, None] = "be816c4815c4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # существующим вакансиям проставляется время миграции
+    op.add_column(
+        "vacancy",
+        sa.Column(
+            "created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False
+        ),
+    )
+    op.add_column(
+        "vacancy",
+        sa.Column(
+            "updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False
+        ),
+    )
+    op.alter_column("vacancy", "created_at", server_default=None)
+    op.alter_column("vacancy", "updated_at", server_default=None)
+
+    op.create_index("ix_card_created_at_id", "card", ["created_at", "id"])
+    op.create_index("ix_vacancy_created_at_id", "vacancy", ["created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_vacancy_created_at_id", table_name="vacancy")
+    op.drop_index("ix_card_created_at_id", table_name="card")
+    op.drop_column("vacancy", "updated_at")
+    op.drop_column("vacancy", "created_at")
@@ -0,0 +1,150 @@
+import subprocess
+import tempfile
+from functools import cached_property
+
+import numpy as np
+import torch
+
+from ml.cache import content_digest
+from ml.constants import SAMPLE_RATE
+
+
+class AudioBuffer:
+    """
+    Аудиодорожка видео, декодируемая не более одного раза и только по требованию.
+
+    Attributes:
+    -----------
+    video : bytes
+        Исходное видео; из него же выбираются кадры для визуальной модальности.
+    digest : str
+        sha256 исходного видео, по которому кэшируются транскрипция и эмбеддинги.
+    waveform : numpy.ndarray
+        Моно-сигнал 16 кГц; ffmpeg запускается при первом обращении.
+    """
+
+    def __init__(self, video: bytes):
+        self.video = video
+
+    @cached_property
+    def digest(self) -> str:
+        return content_digest(self.video)
+
+    @cached_property
+    def waveform(self) -> np.ndarray:
+        return decode_audio(self.video)
+
+
+def decode_audio(video: bytes, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Декодирует аудиодорожку видео в моно-сигнал float32 с заданной частотой дискретизации.
+
+    Параметры
+    ----------
+    video : bytes
+        Содержимое видеофайла.
+    sample_rate : int, optional
+        Частота дискретизации результата (по умолчанию 16 кГц — её ожидают Whisper и ImageBind).
+
+    Возвращает
+    -------
+    numpy.ndarray
+        Одномерный массив отсчётов в диапазоне [-1, 1].
+
+    Примечания
+    ---------
+    - ffmpeg запускается один раз и пишет PCM в stdout, промежуточный WAV не создаётся.
+    - Контейнер всё же кладётся во временный файл: у MP4 индекс (moov) часто лежит
+      в конце файла, и ffmpeg не может прочитать такой файл из неперематываемого pipe.
+      Файл удаляется сразу после декодирования.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".mp4") as container:
+        container.write(video)
+        container.flush()
+
+        pcm = subprocess.run(
+            [
+                "ffmpeg",
+                "-nostdin",
+                "-threads",
+                "0",
+                "-i",
+                container.name,
+                "-f",
+                "s16le",
+                "-ac",
+                "1",
+                "-acodec",
+                "pcm_s16le",
+                "-ar",
+                str(sample_rate),
+                "-loglevel",
+                "error",
+                "-",
+            ],
+            capture_output=True,
+            check=True,
+        ).stdout
+
+    return np.frombuffer(pcm, np.int16).astype(np.float32) / 32768.0
+
+
+def load_and_transform_audio_waveform(
+    waveform: np.ndarray,
+    device,
+    num_mel_bins: int = 128,
+    target_length: int = 204,
+    sample_rate: int = SAMPLE_RATE,
+    clip_duration: int = 2,
+    clips_per_video: int = 3,
+    mean: float = -4.268,
+    std: float = 9.138,
+) -> torch.Tensor:
+    """
+    Готовит вход аудио-модальности ImageBind из уже декодированного сигнала.
+
+    Повторяет `imagebind.data.load_and_transform_audio_data`, но принимает массив
+    отсчётов вместо пути к WAV-файлу, поэтому аудио не читается с диска повторно.
+
+    Параметры
+    ----------
+    waveform : numpy.ndarray
+        Моно-сигнал с частотой дискретизации `sample_rate`.
+    device : torch.device
+        Устройство, на которое переносится результат.
+
+    Возвращает
+    -------
+    torch.Tensor
+        Тензор формы (1, clips_per_video, 1, num_mel_bins, target_length).
+    """
+    # imagebind и torchvision нужны только процессу с моделями, а не API
+    from imagebind.utils import data
+    from pytorchvideo.data.clip_sampling import ConstantClipsPerVideoSampler
+    from torchvision import transforms
+
+    clip_sampler = ConstantClipsPerVideoSampler(
+        clip_duration=clip_duration, clips_per_video=clips_per_video
+    )
+    normalize = transforms.Normalize(mean=mean, std=std)
+
+    # waveform2melspec центрирует клипы на месте, поэтому работаем с копией буфера
+    waveform = torch.tensor(waveform).unsqueeze(0)
+    all_clips_timepoints = data.get_clip_timepoints(
+        clip_sampler, waveform.size(1) / sample_rate
+    )
+
+    all_clips = []
+    for clip_timepoints in all_clips_timepoints:
+        waveform_clip = waveform[
+            :,
+            int(clip_timepoints[0] * sample_rate) : int(
+                clip_timepoints[1] * sample_rate
+            ),
+        ]
+        waveform_melspec = data.waveform2melspec(
+            waveform_clip, sample_rate, num_mel_bins, target_length
+        )
+        all_clips.append(normalize(waveform_melspec).to(device))
+
+    return torch.stack(all_clips, dim=0).unsqueeze(0)
@@ -0,0 +1,138 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Generic, Sequence, TypeVar
+
+import torch
+
+from ml.constants import AUDIO_MODALITY, TEXT_MODALITY, VISION_MODALITY
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Собирает одиночные запросы из разных потоков в пакеты для одного прямого прохода модели.
+
+    Фоновый поток ждёт первый запрос, затем добирает пакет, пока не наберётся
+    `max_batch_size` элементов или не истечёт окно `max_wait` секунд, и
+    раздаёт результаты ожидающим вызывающим через `Future`.
+
+    Attributes:
+    -----------
+    max_batch_size : int
+        Максимальный размер пакета.
+    max_wait : float
+        Сколько секунд ждать добора пакета после первого запроса.
+    """
+
+    def __init__(
+        self,
+        forward: Callable[[Sequence[T]], Sequence[R]],
+        max_batch_size: int = 8,
+        max_wait: float = 0.01,
+        name: str = "micro-batcher",
+    ):
+        self._forward = forward
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._name = name
+
+        self._lock = threading.Lock()
+        self._queue: queue.Queue | None = None
+        self._pid: int | None = None
+
+    def _ensure_started(self) -> queue.Queue:
+        # после fork потоки родителя не существуют, поэтому поток запускается
+        # заново в каждом процессе при первом обращении
+        with self._lock:
+            if self._queue is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                threading.Thread(
+                    target=self._loop, args=(self._queue,), name=self._name, daemon=True
+                ).start()
+            return self._queue
+
+    def submit(self, item: T) -> Future:
+        future = Future()
+        self._ensure_started().put((item, future))
+        return future
+
+    def __call__(self, item: T) -> R:
+        return self.submit(item).result()
+
+    def _loop(self, requests: queue.Queue) -> None:
+        while True:
+            batch = [requests.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(requests.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            self._run(batch)
+
+    def _run(self, batch: list[tuple[T, Future]]) -> None:
+        batch = [
+            (item, future)
+            for item, future in batch
+            if future.set_running_or_notify_cancel()
+        ]
+        if not batch:
+            return
+
+        try:
+            results = self._forward([item for item, _ in batch])
+        except BaseException as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+def create_imagebind_batchers(
+    get_model: Callable[[], Any], max_batch_size: int, max_wait: float
+) -> dict[str, MicroBatcher[torch.Tensor, torch.Tensor]]:
+    """
+    Создаёт по одному батчеру на модальность ImageBind, используемую сервисом.
+
+    Модель запрашивается через `get_model` при первом пакете, поэтому создание
+    батчеров не загружает ImageBind. Каждый запрос — уже подготовленный вход
+    модальности: для аудио и текста с пакетным измерением 1, для кадров видео —
+    по одной строке на кадр. Результат — эмбеддинг формы (1024,), для видео
+    усреднённый по кадрам.
+    """
+
+    def forward_for(modality: str) -> Callable[[Sequence[torch.Tensor]], list]:
+        def forward(inputs: Sequence[torch.Tensor]) -> list[torch.Tensor]:
+            model = get_model()
+            sizes = [item.shape[0] for item in inputs]
+            with torch.inference_mode():
+                embeddings = model({modality: torch.cat(list(inputs), dim=0)})
+            return [
+                chunk.mean(dim=0)
+                for chunk in torch.split(embeddings[modality], sizes, dim=0)
+            ]
+
+        return forward
+
+    return {
+        modality: MicroBatcher(
+            forward_for(modality),
+            max_batch_size=max_batch_size,
+            max_wait=max_wait,
+            name=f"imagebind-{modality}",
+        )
+        for modality in (AUDIO_MODALITY, TEXT_MODALITY, VISION_MODALITY)
+    }
@@ -0,0 +1,218 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from loguru import logger
+
+from configs.Environment import get_environment_variables
+
+
+def content_digest(content: bytes | str) -> str:
+    """Возвращает sha256 содержимого, которым адресуются записи кэша."""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Двухуровневый кэш массивов по хэшу содержимого: LRU в памяти и .npy-файлы на диске.
+
+    Файлы читаются через `np.load(mmap_mode="r")`, поэтому попадание в дисковый
+    уровень не копирует эмбеддинг в память процесса. Оба уровня ограничены по
+    размеру в байтах и вытесняют давно не использованные записи.
+
+    Attributes:
+    -----------
+    hits : dict[str, int]
+        Число попаданий по уровням ("memory", "disk").
+    misses : int
+        Число промахов мимо обоих уровней.
+    """
+
+    def __init__(
+        self,
+        directory: str | None,
+        memory_limit: int,
+        disk_limit: int,
+    ):
+        self._directory = directory
+        self._memory_limit = memory_limit
+        self._disk_limit = disk_limit
+
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._memory_size = 0
+        self._disk_size = 0
+
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+
+        if self._directory:
+            os.makedirs(self._directory, exist_ok=True)
+            self._disk_size = sum(os.path.getsize(path) for path in self._disk_files())
+
+    def get(self, namespace: str, key: str) -> np.ndarray | None:
+        entry = f"{namespace}/{key}"
+        with self._lock:
+            value = self._memory.get(entry)
+            if value is not None:
+                self._memory.move_to_end(entry)
+                self.hits["memory"] += 1
+                return value
+
+        value = self._read_disk(entry)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+
+            self.hits["disk"] += 1
+            self._remember(entry, value)
+            return value
+
+    def put(self, namespace: str, key: str, value: np.ndarray) -> None:
+        entry = f"{namespace}/{key}"
+        value = np.ascontiguousarray(value)
+        with self._lock:
+            self._remember(entry, value)
+
+        self._write_disk(entry, value)
+
+    def get_text(self, namespace: str, key: str) -> str | None:
+        value = self.get(namespace, key)
+        return None if value is None else value.tobytes().decode("utf-8")
+
+    def put_text(self, namespace: str, key: str, text: str) -> None:
+        self.put(namespace, key, np.frombuffer(text.encode("utf-8"), dtype=np.uint8))
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "memory_hits": self.hits["memory"],
+                "disk_hits": self.hits["disk"],
+                "misses": self.misses,
+                "memory_bytes": self._memory_size,
+                "disk_bytes": self._disk_size,
+            }
+
+    def _remember(self, entry: str, value: np.ndarray) -> None:
+        if value.nbytes > self._memory_limit:
+            return
+
+        previous = self._memory.pop(entry, None)
+        if previous is not None:
+            self._memory_size -= previous.nbytes
+
+        self._memory[entry] = value
+        self._memory_size += value.nbytes
+
+        while self._memory_size > self._memory_limit:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= evicted.nbytes
+
+    def _path(self, entry: str) -> str:
+        namespace, key = entry.split("/", 1)
+        return os.path.join(self._directory, namespace, key[:2], f"{key}.npy")
+
+    def _disk_files(self) -> list[str]:
+        return [
+            os.path.join(root, name)
+            for root, _, names in os.walk(self._directory)
+            for name in names
+            if name.endswith(".npy")
+        ]
+
+    def _read_disk(self, entry: str) -> np.ndarray | None:
+        if not self._directory:
+            return None
+
+        path = self._path(entry)
+        try:
+            value = np.load(path, mmap_mode="r")
+            # время доступа обновляем вручную: на noatime-разделах оно не меняется,
+            # а по нему вытесняются старые файлы
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        return value
+
+    def _write_disk(self, entry: str, value: np.ndarray) -> None:
+        if not self._directory:
+            return
+
+        path = self._path(entry)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # запись через временный файл, чтобы параллельные процессы не прочитали половину
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, value)
+        size = os.path.getsize(tmp_path)
+
+        with self._lock:
+            # перезапись существующего файла не должна увеличивать занятый объём
+            try:
+                size -= os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+
+            self._disk_size += size
+            if self._disk_size > self._disk_limit:
+                self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        files = sorted(self._disk_files(), key=os.path.getmtime)
+        self._disk_size = sum(os.path.getsize(path) for path in files)
+
+        # освобождаем с запасом, чтобы не обходить каталог на каждой записи
+        target = self._disk_limit * 0.9
+        for path in files:
+            if self._disk_size <= target:
+                break
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self._disk_size -= size
+
+        logger.debug(f"embedding cache evicted to {self._disk_size} bytes on disk")
+
+
+def _export_fingerprint(directory: str) -> str:
+    # графы экспорта различаются не именем, а содержимым (fp32 или --int8,
+    # повторный экспорт), поэтому в имя подкаталога входят их размеры и mtime
+    digest = hashlib.sha256()
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            stat = os.stat(os.path.join(directory, name))
+            digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:12]
+
+
+@lru_cache
+def get_embedding_cache() -> EmbeddingCache:
+    env = get_environment_variables()
+
+    # эмбеддинги и транскрипции зависят от точности инференса и бэкенда
+    # ImageBind, поэтому результаты каждого режима, кроме fp32 на torch, лежат
+    # в своём подкаталоге
+    directory = env.EMBEDDING_CACHE_DIR or None
+    if directory and env.INFERENCE_PRECISION != "fp32":
+        directory = os.path.join(directory, env.INFERENCE_PRECISION)
+    if directory and env.ML_BACKEND != "torch":
+        fingerprint = _export_fingerprint(env.IMAGEBIND_EXPORT_DIR)
+        directory = os.path.join(directory, f"{env.ML_BACKEND}-{fingerprint}")
+
+    return EmbeddingCache(
+        directory=directory,
+        memory_limit=env.EMBEDDING_CACHE_MEMORY_MB * 1024 * 1024,
+        disk_limit=env.EMBEDDING_CACHE_DISK_MB * 1024 * 1024,
+    )
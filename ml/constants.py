@@ -9,7 +9,23 @@ LABEL_NAMES = [
 
 EMBEDDING_FEATURES = ["audio_embedding", "text_embedding"]
 
+# черты OCEAN, по которым сопоставляются карточки и вакансии
+MATCHING_TRAITS = LABEL_NAMES[:5]
+
+SAMPLE_RATE = 16000
+
+# модальности ImageBind — значения `imagebind.model.ModalityType`; объявлены
+# здесь, чтобы ради строковых ключей не импортировать imagebind при старте API
+AUDIO_MODALITY = "audio"
+TEXT_MODALITY = "text"
+VISION_MODALITY = "vision"
+
 
 RUGPT = "sberbank-ai/rugpt3large_based_on_gpt2"
 
-CLASSIFIER_PATH = "ml/models/models.pkl"
\ No newline at end of file
+# общее начало всех промптов совета; его KV-кэш считается один раз
+ADVICE_PROMPT_PREFIX = "У кандидата следующие показатели личности:\n- Экстраверсия:"
+
+CLASSIFIER_PATH = "ml/models/models.pkl"
+
+PERSONALITY_STATISTICS_PATH = "ml/models/personality_statistics.json"
\ No newline at end of file
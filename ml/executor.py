@@ -0,0 +1,182 @@
+import asyncio
+import gc
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterator
+
+import torch
+from loguru import logger
+
+from ml.lifespan import device, registry
+
+# сервис процесса пула; создаётся инициализатором один раз на процесс
+_service: Any = None
+
+
+def _init_process(factory: Callable[[], Any], threads: int, preload: bool) -> None:
+    global _service
+
+    # без ограничения каждый процесс занимает все ядра потоками torch
+    torch.set_num_threads(threads)
+    if preload:
+        registry.preload(background=False)
+    _service = factory()
+
+
+def _call(method: str, *args) -> Any:
+    return getattr(_service, method)(*args)
+
+
+# конец потока событий; генераторы сервиса не выдают None
+_END = None
+
+
+def _produce(items: Iterator[Any], put: Callable[[Any], None]) -> None:
+    try:
+        for item in items:
+            put(item)
+    finally:
+        put(_END)
+
+
+def _stream(method: str, args: tuple, queue) -> None:
+    _produce(getattr(_service, method)(*args), queue.put)
+
+
+class MlExecutor:
+    """
+    Выполняет этапы `MlService` в пуле процессов и возвращает результат как awaitable.
+
+    Модели загружаются в родительском процессе до создания пула, и процессы,
+    запущенные через fork, получают их страницы по copy-on-write без повторной
+    загрузки. CUDA не переживает fork, поэтому на GPU процессы запускаются через
+    spawn и загружают модели сами. При `processes == 0` пул не создаётся и этапы
+    выполняются в потоке текущего процесса, где микробатчер ImageBind объединяет
+    запросы параллельных карточек.
+
+    Attributes:
+    -----------
+    processes : int
+        Число процессов пула.
+    """
+
+    def __init__(self, factory: Callable[[], Any], processes: int = 0):
+        self._factory = factory
+        self.processes = processes
+
+        self._lock = threading.Lock()
+        self._pool: ProcessPoolExecutor | None = None
+        self._manager = None
+        self._service: Any = None
+
+    def start(self, preload: bool = False) -> None:
+        """
+        Создаёт пул процессов (или сервис текущего процесса) и при необходимости загружает модели.
+
+        Вызов блокирующий: при fork модели должны быть загружены до создания
+        процессов, иначе каждый из них загрузит свою копию.
+        """
+        with self._lock:
+            if self.processes <= 0:
+                if self._service is None:
+                    self._service = self._factory()
+                    if preload:
+                        registry.preload(background=True)
+                return
+
+            if self._pool is not None:
+                return
+
+            method = "fork" if device == "cpu" else "spawn"
+
+            # очереди менеджера передают события `stream` из процессов пула;
+            # процесс менеджера создаётся до загрузки моделей, чтобы не
+            # наследовать их память
+            self._manager = multiprocessing.get_context(method).Manager()
+
+            if preload and method == "fork":
+                registry.preload(background=False)
+                # объекты, созданные до fork, не трогаются сборщиком мусора
+                # в дочерних процессах, и их страницы остаются общими
+                gc.freeze()
+
+            threads = max(1, (os.cpu_count() or 1) // self.processes)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context(method),
+                initializer=_init_process,
+                initargs=(self._factory, threads, preload and method == "spawn"),
+            )
+            logger.info(
+                f"ML - Executor - started {self.processes} processes ({method}, {threads} threads each)"
+            )
+
+    async def run(self, method: str, *args) -> Any:
+        """
+        Вызывает метод сервиса с аргументами в пуле и ждёт результат, не блокируя event loop.
+
+        Аргументы и результат передаются между процессами через pickle, поэтому
+        методы должны принимать и возвращать небольшие объекты — байты видео,
+        строки, словари.
+        """
+        if self._pool is None and self._service is None:
+            await asyncio.to_thread(self.start)
+
+        if self._pool is None:
+            return await asyncio.to_thread(getattr(self._service, method), *args)
+
+        return await asyncio.wrap_future(self._pool.submit(_call, method, *args))
+
+    async def stream(self, method: str, *args) -> AsyncIterator[Any]:
+        """
+        Вызывает метод-генератор сервиса и выдаёт его элементы по мере готовности.
+
+        Генератор выполняется в процессе пула (или в потоке текущего процесса),
+        элементы передаются через очередь по одному. Исключение генератора
+        выбрасывается после уже выданных элементов.
+        """
+        if self._pool is None and self._service is None:
+            await asyncio.to_thread(self.start)
+
+        loop = asyncio.get_running_loop()
+        items: asyncio.Queue = asyncio.Queue()
+
+        def put(item: Any) -> None:
+            loop.call_soon_threadsafe(items.put_nowait, item)
+
+        relay = None
+        if self._pool is None:
+            generator = getattr(self._service, method)(*args)
+            task = asyncio.ensure_future(asyncio.to_thread(_produce, generator, put))
+        else:
+            queue = self._manager.Queue()
+            task = asyncio.wrap_future(self._pool.submit(_stream, method, args, queue))
+            # поток переносит события из очереди менеджера в event loop
+            relay = asyncio.ensure_future(
+                asyncio.to_thread(_produce, iter(queue.get, _END), put)
+            )
+
+            def stop(future: asyncio.Future) -> None:
+                # процесс пула мог упасть, не дописав конец потока
+                if future.cancelled() or future.exception() is not None:
+                    queue.put(_END)
+
+            task.add_done_callback(stop)
+
+        while (item := await items.get()) is not _END:
+            yield item
+
+        if relay is not None:
+            await relay
+        await task
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
@@ -0,0 +1,172 @@
+"""
+Экспорт энкодеров ImageBind в ONNX или TorchScript для `ML_BACKEND`.
+
+Запуск:
+
+    python -m ml.export ml/models/imagebind --format onnx
+    python -m ml.export ml/models/imagebind --format torchscript --modalities audio text
+
+Для каждой модальности пишется отдельный граф `<модальность>.onnx` или
+`<модальность>.pt`: предобработка, трансформер модальности, голова и
+нормализация — всё, что делает `imagebind_huge` для одного входа. Пакетное
+измерение динамическое. После экспорта граф прогоняется на пакете другого
+размера и сравнивается с исходной моделью; если косинусная близость ниже
+`--min-cosine`, команда завершается с кодом 1.
+
+`--int8` дополнительно квантует веса ONNX-графа в int8 средствами
+`onnxruntime.quantization`.
+"""
+
+import argparse
+import os
+import sys
+
+import torch
+from imagebind.model import ModalityType
+from imagebind.utils import data
+from loguru import logger
+from torch import nn
+
+from configs.Environment import get_environment_variables
+from ml.imagebind_loader import load_imagebind
+from ml.runtime import ExportedImageBind, export_path
+
+# форма входа модальности без пакетного измерения: так её готовят
+# `load_and_transform_audio_waveform` и `frames_to_tensor`
+EXAMPLE_SHAPES = {
+    ModalityType.AUDIO: (3, 1, 128, 204),
+    ModalityType.VISION: (3, 224, 224),
+}
+
+MODALITIES = [ModalityType.AUDIO, ModalityType.TEXT, ModalityType.VISION]
+
+
+class ModalityEncoder(nn.Module):
+    """Обёртка ImageBind с одним тензорным входом и выходом для одной модальности."""
+
+    def __init__(self, model: nn.Module, modality: str):
+        super().__init__()
+        self.model = model
+        self.modality = modality
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.model({self.modality: x})[self.modality]
+
+
+def example_input(modality: str, batch_size: int) -> torch.Tensor:
+    if modality == ModalityType.TEXT:
+        # голова текста берёт эмбеддинг токена конца текста, поэтому пример —
+        # настоящий токенизированный текст, а не случайные индексы
+        return data.load_and_transform_text(["пример текста"] * batch_size, "cpu")
+
+    return torch.randn((batch_size, *EXAMPLE_SHAPES[modality]))
+
+
+def export_modality(
+    model: nn.Module, modality: str, output: str, fmt: str, opset: int
+) -> str:
+    encoder = ModalityEncoder(model, modality).eval()
+    example = example_input(modality, 2)
+    path = export_path(output, modality, fmt)
+
+    with torch.inference_mode():
+        if fmt == "onnx":
+            torch.onnx.export(
+                encoder,
+                (example,),
+                path,
+                input_names=["input"],
+                output_names=["embedding"],
+                dynamic_axes={"input": {0: "batch"}, "embedding": {0: "batch"}},
+                opset_version=opset,
+            )
+        else:
+            torch.jit.trace(encoder, example, check_trace=False).save(path)
+
+    logger.info(f"Export - {modality} - {path}")
+    return path
+
+
+def quantize_onnx(path: str) -> None:
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantized = path + ".int8"
+    quantize_dynamic(path, quantized, weight_type=QuantType.QInt8)
+    os.replace(quantized, path)
+    logger.info(f"Export - quantized {path}")
+
+
+def verify(
+    model: nn.Module, output: str, fmt: str, modalities: list[str], min_cosine: float
+) -> bool:
+    exported = ExportedImageBind(
+        output, fmt, modalities, "cpu", torch.get_num_threads()
+    )
+
+    failures = []
+    for modality in modalities:
+        # другой размер пакета проверяет, что пакетное измерение не зашито в граф
+        inputs = {modality: example_input(modality, 3)}
+        with torch.inference_mode():
+            expected = model(inputs)[modality]
+        actual = exported(inputs)[modality]
+
+        if actual.shape != expected.shape:
+            logger.error(
+                f"Export - {modality} - output shape {tuple(actual.shape)}, "
+                f"expected {tuple(expected.shape)}"
+            )
+            failures.append(modality)
+            continue
+
+        cosine = float(
+            torch.nn.functional.cosine_similarity(expected, actual, dim=-1).min()
+        )
+        logger.info(
+            f"Export - {modality} - min cosine to eager {cosine:.5f}, "
+            f"max abs diff {float((expected - actual).abs().max()):.2e}"
+        )
+        if cosine < min_cosine:
+            failures.append(modality)
+
+    if failures:
+        logger.error(f"Export - verification failed: {', '.join(failures)}")
+    return not failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Export ImageBind modality encoders for ML_BACKEND=onnx|torchscript."
+    )
+    parser.add_argument("output", help="directory for the exported graphs")
+    parser.add_argument("--format", choices=["onnx", "torchscript"], default="onnx")
+    parser.add_argument(
+        "--modalities",
+        nargs="+",
+        default=[ModalityType.AUDIO, ModalityType.TEXT],
+        choices=MODALITIES,
+    )
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument(
+        "--checkpoint", default=get_environment_variables().IMAGEBIND_CHECKPOINT
+    )
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    parser.add_argument(
+        "--int8", action="store_true", help="quantize ONNX weights to int8"
+    )
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+
+    model = load_imagebind(args.modalities, "cpu", args.checkpoint)
+    for modality in args.modalities:
+        path = export_modality(model, modality, args.output, args.format, args.opset)
+        if args.int8 and args.format == "onnx":
+            quantize_onnx(path)
+
+    passed = verify(model, args.output, args.format, args.modalities, args.min_cosine)
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Пакетное извлечение эмбеддингов архива видео для переобучения моделей.
+
+Запуск:
+
+    python -m ml.extract videos/ out/ --workers 4
+    python -m ml.extract manifest.csv out/ --videos videos/ --workers 4
+
+Источник — каталог (берутся все .mp4, название — имя файла, описание пустое)
+или CSV-манифест с колонками `video_path`, `title`, `description`.
+Результат пишется в каталог `out/`:
+
+- `index.csv` — порядок строк (путь, название, описание);
+- `embeddings.npy` — матрица float32 (N, 4096): название, описание, аудио, видео;
+- `done.npy` — отметки обработанных строк.
+
+Массивы открываются через `np.lib.format.open_memmap`, поэтому архив любого
+размера не держится в памяти, а повторный запуск с тем же источником
+продолжает с необработанных строк.
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import torch
+from loguru import logger
+
+from configs.Environment import get_environment_variables
+from ml.dataloader import extract_embeddings
+from ml.imagebind_loader import load_imagebind
+from ml.summarizer import load_summary_model
+
+EMBEDDING_DIM = 4 * 1024
+
+INDEX_COLUMNS = ["video_path", "title", "description"]
+
+# модели процесса пула; загружаются инициализатором один раз на процесс
+_models: dict[str, Any] = {}
+
+
+def load_index(source: str, videos: str | None = None) -> pd.DataFrame:
+    """Собирает таблицу видео из каталога или CSV-манифеста в стабильном порядке."""
+    if os.path.isdir(source):
+        paths = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(source)
+            for name in names
+            if name.lower().endswith(".mp4")
+        )
+        return pd.DataFrame(
+            {
+                "video_path": paths,
+                "title": [os.path.splitext(os.path.basename(p))[0] for p in paths],
+                "description": [""] * len(paths),
+            }
+        )
+
+    # dtype=str: названия вроде "0001" не должны превращаться в числа
+    index = pd.read_csv(source, dtype=str, keep_default_na=False)
+    missing = set(INDEX_COLUMNS) - set(index.columns)
+    if missing:
+        raise ValueError(f"manifest has no columns: {', '.join(sorted(missing))}")
+
+    index = index[INDEX_COLUMNS].astype(str)
+    if videos:
+        index["video_path"] = [os.path.join(videos, p) for p in index["video_path"]]
+    return index
+
+
+def open_store(output: str, index: pd.DataFrame) -> tuple[np.memmap, np.memmap]:
+    """
+    Открывает хранилище эмбеддингов или создаёт новое под `index`.
+
+    Если хранилище уже создано для другого набора видео, продолжать его
+    нельзя, и выбрасывается `ValueError`.
+    """
+    os.makedirs(output, exist_ok=True)
+    index_path = os.path.join(output, "index.csv")
+    embeddings_path = os.path.join(output, "embeddings.npy")
+    done_path = os.path.join(output, "done.npy")
+
+    if os.path.exists(index_path):
+        stored = pd.read_csv(index_path, dtype=str, keep_default_na=False)
+        if not stored.equals(index.reset_index(drop=True)):
+            raise ValueError(f"{output} was created for another set of videos")
+
+        return (
+            np.lib.format.open_memmap(embeddings_path, mode="r+"),
+            np.lib.format.open_memmap(done_path, mode="r+"),
+        )
+
+    embeddings = np.lib.format.open_memmap(
+        embeddings_path, mode="w+", dtype=np.float32, shape=(len(index), EMBEDDING_DIM)
+    )
+    done = np.lib.format.open_memmap(
+        done_path, mode="w+", dtype=np.bool_, shape=(len(index),)
+    )
+    # индекс пишется последним: по нему повторный запуск понимает, что массивы созданы
+    index.to_csv(index_path, index=False)
+
+    return embeddings, done
+
+
+def _init_process(device: str, threads: int, checkpoint: str) -> None:
+    torch.set_num_threads(threads)
+
+    # заголовок и описание идут через текстовую ветку, кадры — через визуальную
+    imagebind_model = load_imagebind(["audio", "text", "vision"], device, checkpoint)
+
+    summary_tokenizer, summary_model = load_summary_model(device)
+
+    _models.update(
+        device=device,
+        imagebind=imagebind_model,
+        summary_tokenizer=summary_tokenizer,
+        summary_model=summary_model,
+    )
+
+
+def _extract(row: int, video_path: str, title: str, description: str) -> tuple[int, np.ndarray]:
+    embeddings = extract_embeddings(
+        video_path,
+        title,
+        description,
+        _models["imagebind"],
+        _models["summary_tokenizer"],
+        _models["summary_model"],
+        _models["device"],
+    )
+    return row, embeddings.float().cpu().numpy()
+
+
+def run(
+    source: str,
+    output: str,
+    videos: str | None = None,
+    workers: int = 1,
+    checkpoint_every: int = 32,
+    checkpoint: str | None = None,
+) -> None:
+    checkpoint = checkpoint or get_environment_variables().IMAGEBIND_CHECKPOINT
+
+    index = load_index(source, videos)
+    embeddings, done = open_store(output, index)
+
+    pending = np.flatnonzero(~done)
+    logger.info(f"Extract - {len(index)} videos, {len(pending)} pending")
+    if not len(pending):
+        return
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    # CUDA не переживает fork, поэтому на GPU процессы запускаются через spawn
+    context = multiprocessing.get_context("spawn" if device == "cuda" else "fork")
+
+    started = time.monotonic()
+    processed = failed = 0
+    rows = iter(pending.tolist())
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_process,
+        initargs=(device, threads, checkpoint),
+    ) as pool:
+
+        def submit(row: int):
+            record = index.iloc[row]
+            return pool.submit(
+                _extract, row, record.video_path, record.title, record.description
+            )
+
+        # в очереди пула держится ограниченное число задач, а не весь архив
+        in_flight = {submit(row) for row, _ in zip(rows, range(2 * workers))}
+        try:
+            while in_flight:
+                completed, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    try:
+                        row, embedding = future.result()
+                    except Exception:
+                        failed += 1
+                        logger.exception("Extract - video failed, it will be retried on the next run")
+                    else:
+                        embeddings[row] = embedding
+                        done[row] = True
+                        processed += 1
+
+                        if processed % checkpoint_every == 0:
+                            _checkpoint(embeddings, done, processed, len(pending), started)
+
+                    next_row = next(rows, None)
+                    if next_row is not None:
+                        in_flight.add(submit(next_row))
+        finally:
+            # при прерывании сохраняется всё, что уже посчитано
+            _checkpoint(embeddings, done, processed, len(pending), started)
+
+    logger.info(f"Extract - finished: {processed} processed, {failed} failed")
+
+
+def _checkpoint(
+    embeddings: np.memmap, done: np.memmap, processed: int, total: int, started: float
+) -> None:
+    # эмбеддинги сбрасываются на диск раньше отметок, чтобы отмеченная строка
+    # никогда не оказалась незаписанной
+    embeddings.flush()
+    done.flush()
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"Extract - checkpoint {processed}/{total}, {processed / max(elapsed, 1e-9):.2f} videos/s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Extract title/description/audio/video embeddings for a video archive."
+    )
+    parser.add_argument("source", help="directory with .mp4 files or a CSV manifest")
+    parser.add_argument("output", help="directory for index.csv, embeddings.npy and done.npy")
+    parser.add_argument("--videos", help="base directory for relative manifest paths")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes")
+    parser.add_argument(
+        "--checkpoint-every", type=int, default=32, help="flush results every N videos"
+    )
+    parser.add_argument(
+        "--checkpoint", help="ImageBind weights, IMAGEBIND_CHECKPOINT by default"
+    )
+    args = parser.parse_args()
+
+    run(
+        args.source,
+        args.output,
+        args.videos,
+        args.workers,
+        args.checkpoint_every,
+        args.checkpoint,
+    )
+
+
+if __name__ == "__main__":
+    main()
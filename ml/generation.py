@@ -0,0 +1,167 @@
+import threading
+import time
+from typing import Any, Callable, Sequence
+
+import torch
+from loguru import logger
+
+from ml.batching import MicroBatcher
+
+
+class AdviceGenerator:
+    """
+    Генерирует советы ruGPT пакетами с общим KV-кэшем префикса промпта.
+
+    Все промпты советов начинаются с одного и того же текста, поэтому ключи и
+    значения внимания для него считаются один раз и расширяются на пакет без
+    копирования. Остальные части промптов разной длины дополняются паддингом
+    между префиксом и хвостом: маска внимания скрывает паддинг, а позиции
+    токенов считаются по маске, поэтому результат совпадает с генерацией без
+    паддинга. Одновременные запросы собирает `MicroBatcher`.
+
+    Attributes:
+    -----------
+    max_new_tokens : int
+        Сколько токенов генерировать сверх промпта.
+    """
+
+    def __init__(
+        self,
+        get_model: Callable[[], tuple[Any, Any]],
+        device,
+        prefix: str,
+        max_new_tokens: int = 100,
+        max_batch_size: int = 8,
+        max_wait: float = 0.05,
+        generation_kwargs: dict[str, Any] | None = None,
+    ):
+        self._get_model = get_model
+        self._device = device
+        self._prefix = prefix
+        self.max_new_tokens = max_new_tokens
+        self._generation_kwargs = generation_kwargs or {}
+
+        self._prefix_ids: torch.Tensor | None = None
+        self._prefix_cache: tuple | None = None
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "batches": 0, "tokens": 0, "seconds": 0.0}
+
+        self._batcher = MicroBatcher(
+            self._generate_batch,
+            max_batch_size=max_batch_size,
+            max_wait=max_wait,
+            name="advice-generator",
+        )
+
+    def __call__(self, prompt: str) -> str:
+        return self._batcher(prompt)
+
+    def stats(self) -> dict[str, float]:
+        """Возвращает счётчики генерации и средние скорости с момента запуска процесса."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+
+        seconds = stats["seconds"] or float("inf")
+        stats["tokens_per_second"] = stats["tokens"] / seconds
+        stats["mean_batch_size"] = stats["requests"] / max(stats["batches"], 1)
+        return stats
+
+    def _ensure_prefix(self, tokenizer, model) -> None:
+        # ключи и значения префикса считаются при первом пакете и
+        # переиспользуются всеми последующими
+        if self._prefix_cache is not None:
+            return
+
+        self._prefix_ids = tokenizer.encode(self._prefix, return_tensors="pt").to(
+            self._device
+        )
+        with torch.inference_mode():
+            output = model(self._prefix_ids, use_cache=True)
+
+        past = output.past_key_values
+        if hasattr(past, "to_legacy_cache"):
+            past = past.to_legacy_cache()
+        self._prefix_cache = past
+
+    def _build_inputs(
+        self, tokenizer, prompts: Sequence[str], pad_token_id: int
+    ) -> tuple[torch.Tensor, torch.Tensor, bool]:
+        encoded = [tokenizer.encode(prompt) for prompt in prompts]
+        prefix = self._prefix_ids[0].tolist()
+        # BPE может склеить последний токен префикса с началом хвоста;
+        # тогда такой пакет генерируется без кэша префикса
+        use_prefix = all(ids[: len(prefix)] == prefix for ids in encoded)
+
+        width = max(len(ids) for ids in encoded)
+        input_ids = torch.full((len(encoded), width), pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(encoded), width), dtype=torch.long)
+        for i, ids in enumerate(encoded):
+            if use_prefix:
+                # префикс слева, паддинг между префиксом и хвостом
+                tail = ids[len(prefix) :]
+                input_ids[i, : len(prefix)] = torch.tensor(prefix)
+                attention_mask[i, : len(prefix)] = 1
+                if tail:
+                    input_ids[i, width - len(tail) :] = torch.tensor(tail)
+                    attention_mask[i, width - len(tail) :] = 1
+            else:
+                input_ids[i, width - len(ids) :] = torch.tensor(ids)
+                attention_mask[i, width - len(ids) :] = 1
+
+        return input_ids.to(self._device), attention_mask.to(self._device), use_prefix
+
+    def _expand_prefix_cache(self, batch_size: int) -> tuple:
+        # expand не копирует тензоры; каждый шаг генерации склеивает кэш с
+        # новыми ключами в новые тензоры, поэтому общий кэш префикса не меняется
+        return tuple(
+            (key.expand(batch_size, -1, -1, -1), value.expand(batch_size, -1, -1, -1))
+            for key, value in self._prefix_cache
+        )
+
+    def _generate_batch(self, prompts: Sequence[str]) -> list[str]:
+        tokenizer, model = self._get_model()
+        self._ensure_prefix(tokenizer, model)
+
+        pad_token_id = tokenizer.pad_token_id
+        if pad_token_id is None:
+            pad_token_id = tokenizer.eos_token_id
+
+        input_ids, attention_mask, use_prefix = self._build_inputs(
+            tokenizer, prompts, pad_token_id
+        )
+
+        kwargs = dict(self._generation_kwargs)
+        if use_prefix:
+            kwargs["past_key_values"] = self._expand_prefix_cache(len(prompts))
+
+        started = time.perf_counter()
+        with torch.inference_mode():
+            output = model.generate(
+                input_ids,
+                attention_mask=attention_mask,
+                max_new_tokens=self.max_new_tokens,
+                eos_token_id=tokenizer.eos_token_id,
+                pad_token_id=pad_token_id,
+                **kwargs,
+            )
+        elapsed = time.perf_counter() - started
+
+        generated = output[:, input_ids.shape[1] :]
+        tokens = int((generated != pad_token_id).sum())
+
+        with self._stats_lock:
+            self._stats["requests"] += len(prompts)
+            self._stats["batches"] += 1
+            self._stats["tokens"] += tokens
+            self._stats["seconds"] += elapsed
+
+        logger.info(
+            f"ML - Generation - batch of {len(prompts)}: {tokens} tokens "
+            f"in {elapsed:.2f}s ({tokens / max(elapsed, 1e-9):.1f} tokens/s)"
+        )
+
+        return [
+            text.strip()
+            for text in tokenizer.batch_decode(generated, skip_special_tokens=True)
+        ]
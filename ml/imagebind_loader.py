@@ -0,0 +1,113 @@
+import os
+from typing import Iterable
+
+import torch
+from loguru import logger
+from torch import nn
+
+# ModuleDict-ы ImageBind, в которых у каждой модальности свой модуль
+MODALITY_DICTS = (
+    "modality_preprocessors",
+    "modality_trunks",
+    "modality_heads",
+    "modality_postprocessors",
+)
+
+
+def load_imagebind(modalities: Iterable[str], device, checkpoint: str) -> nn.Module:
+    """
+    Загружает ImageBind только с нужными модальностями.
+
+    Параметры
+    ----------
+    modalities : Iterable[str]
+        Модальности (`ModalityType`), которые останутся в модели.
+    device : torch.device
+        Устройство модели.
+    checkpoint : str
+        Путь к весам `imagebind_huge.pth`. Если файла нет, модель загружается
+        целиком через `imagebind_huge(True)` (веса скачиваются) и обрезается.
+
+    Возвращает
+    -------
+    torch.nn.Module
+        `ImageBindModel` в режиме eval, у которого в ModuleDict-ах остались
+        только выбранные модальности. Прямой проход обходит только модальности
+        входа, поэтому для них модель работает как полная.
+
+    Примечания
+    ---------
+    - Модель строится на meta-устройстве: ветки модальностей не выделяют
+      память и не инициализируются случайными весами.
+    - Чекпойнт открывается через `torch.load(mmap=True)`, и в модель попадают
+      только тензоры оставленных модальностей; остальные страницы файла не
+      читаются с диска.
+    """
+    import imagebind
+
+    keep = set(modalities)
+
+    if not os.path.exists(checkpoint):
+        logger.warning(f"{checkpoint} not found, loading the full imagebind_huge")
+        model = imagebind.model.imagebind_huge(True)
+        prune_modalities(model, keep)
+        return model.eval().to(device)
+
+    with torch.device("meta"):
+        model = imagebind.model.imagebind_huge(False)
+    prune_modalities(model, keep)
+
+    state = torch.load(checkpoint, map_location="cpu", mmap=True, weights_only=True)
+    state = {key: value for key, value in state.items() if _keeps(key, keep)}
+    model.load_state_dict(state, strict=True, assign=True)
+
+    # буферы, которых нет в чекпойнте (persistent=False), остались бы на meta
+    missing = [
+        name
+        for name, tensor in [*model.named_parameters(), *model.named_buffers()]
+        if tensor.is_meta
+    ]
+    if missing:
+        raise RuntimeError(
+            f"imagebind tensors are not in the checkpoint: {', '.join(missing)}"
+        )
+
+    return model.eval().to(device)
+
+
+def prune_modalities(model: nn.Module, keep: set[str]) -> None:
+    """Удаляет из ModuleDict-ов ImageBind все модальности, кроме `keep`."""
+    for attribute in MODALITY_DICTS:
+        modules: nn.ModuleDict = getattr(model, attribute)
+        for modality in list(modules.keys()):
+            if modality not in keep:
+                del modules[modality]
+
+
+def _keeps(key: str, keep: set[str]) -> bool:
+    parts = key.split(".", 2)
+    return parts[0] not in MODALITY_DICTS or parts[1] in keep
+
+
+def modality_memory(model: nn.Module) -> dict[str, int]:
+    """
+    Считает байты параметров и буферов каждой модальности ImageBind.
+
+    Тензоры, общие для нескольких модулей, учитываются один раз.
+    """
+    if not all(hasattr(model, attribute) for attribute in MODALITY_DICTS):
+        return {}
+
+    seen: set[int] = set()
+    memory: dict[str, int] = {}
+    for attribute in MODALITY_DICTS:
+        for modality, module in getattr(model, attribute).items():
+            size = 0
+            for tensor in [*module.parameters(), *module.buffers()]:
+                if tensor.data_ptr() in seen:
+                    continue
+                seen.add(tensor.data_ptr())
+                size += tensor.numel() * tensor.element_size()
+            memory[modality] = memory.get(modality, 0) + size
+
+    return memory
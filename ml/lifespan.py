@@ -1,29 +1,123 @@
 import pickle
 
 import torch
-import whisper
-import imagebind
 from loguru import logger
-from transformers import GPT2Tokenizer, GPT2LMHeadModel
 
-from ml.constants import RUGPT, CLASSIFIER_PATH
+from configs.Environment import get_environment_variables
+from ml.batching import create_imagebind_batchers
+from ml.constants import (
+    ADVICE_PROMPT_PREFIX,
+    CLASSIFIER_PATH,
+    EMBEDDING_FEATURES,
+    RUGPT,
+)
+from ml.generation import AdviceGenerator
+from ml.imagebind_loader import load_imagebind, modality_memory
+from ml.precision import apply_precision
+from ml.registry import ModelRegistry
+from ml.runtime import intra_op_threads
+
+env = get_environment_variables()
 
 device = "cuda" if torch.cuda.is_available() else "cpu"
 
-logger.debug("loading wisper")
-whisper_model = whisper.load_model("tiny")
-whisper_model.eval()
-whisper_model.to(device)
+registry = ModelRegistry(enabled=env.ML_MODELS)
+
+
+def _load_whisper():
+    import whisper
+
+    logger.debug("loading wisper")
+    whisper_model = whisper.load_model("tiny")
+    whisper_model.eval()
+    whisper_model.to(device)
+    # декодирование вызывает энкодер и декодер Whisper напрямую, минуя forward модели
+    return apply_precision(
+        whisper_model,
+        env.INFERENCE_PRECISION,
+        device,
+        modules=[whisper_model.encoder, whisper_model.decoder],
+    )
+
+
+def _imagebind_modalities() -> list[str]:
+    # настроенные модальности плюс те, без которых MlService не посчитает признаки:
+    # аудио и текст нужны всегда, кадры — если модели обучены на video_embedding
+    required = ["audio", "text"]
+    if "video_embedding" in EMBEDDING_FEATURES:
+        required.append("vision")
+
+    modalities = list(env.IMAGEBIND_MODALITIES)
+    modalities += [modality for modality in required if modality not in modalities]
+    return modalities
+
+
+def _load_imagebind():
+    if env.ML_BACKEND != "torch":
+        from ml.runtime import ExportedImageBind
+
+        logger.debug(f"loading exported imagebind ({env.ML_BACKEND})")
+        if env.INFERENCE_PRECISION != "fp32":
+            # точность экспортированного графа задаётся при экспорте (ml.export --int8)
+            logger.warning(
+                f"INFERENCE_PRECISION={env.INFERENCE_PRECISION} does not apply to "
+                f"ML_BACKEND={env.ML_BACKEND}, imagebind runs the exported graph as is"
+            )
+        return ExportedImageBind(
+            env.IMAGEBIND_EXPORT_DIR,
+            env.ML_BACKEND,
+            _imagebind_modalities(),
+            device,
+            intra_op_threads(env.ML_PROCESSES, env.ML_INTRA_OP_THREADS),
+        )
+
+    logger.debug("loading imagebind")
+    imagebind_model = load_imagebind(
+        _imagebind_modalities(), device, env.IMAGEBIND_CHECKPOINT
+    )
+    logger.info(f"imagebind memory by modality: {modality_memory(imagebind_model)}")
+    return apply_precision(imagebind_model, env.INFERENCE_PRECISION, device)
+
+
+def _load_rugpt():
+    from transformers import GPT2Tokenizer, GPT2LMHeadModel
+
+    logger.debug("loading bert")
+    bert_tokenizer = GPT2Tokenizer.from_pretrained(RUGPT)
+    bert_model = GPT2LMHeadModel.from_pretrained(RUGPT)
+    bert_model.eval()
+    bert_model.to(device)
+    return bert_tokenizer, apply_precision(bert_model, env.INFERENCE_PRECISION, device)
+
+
+def _load_catboost():
+    with open(CLASSIFIER_PATH, "rb") as f:
+        return pickle.load(f)
+
 
-logger.debug("loading imagebind")
-imagebind_model = imagebind.model.imagebind_huge(True)
-imagebind_model.eval()
-imagebind_model.to(device)
+registry.register("whisper", _load_whisper)
+registry.register("imagebind", _load_imagebind, memory=modality_memory)
+registry.register("rugpt", _load_rugpt)
+registry.register("catboost", _load_catboost)
 
-logger.debug("loading bert")
-bert_tokenizer = GPT2Tokenizer.from_pretrained(RUGPT)
-bert_model = GPT2LMHeadModel.from_pretrained(RUGPT)
-bert_model.to(device)
+imagebind_batchers = create_imagebind_batchers(
+    lambda: registry.get("imagebind"),
+    max_batch_size=env.IMAGEBIND_BATCH_SIZE,
+    max_wait=env.IMAGEBIND_BATCH_WINDOW_MS / 1000,
+)
 
-with open(CLASSIFIER_PATH, "rb") as f:
-    catboost_models = pickle.load(f)
+advice_generator = AdviceGenerator(
+    lambda: registry.get("rugpt"),
+    device,
+    prefix=ADVICE_PROMPT_PREFIX,
+    max_new_tokens=env.ADVICE_MAX_NEW_TOKENS,
+    max_batch_size=env.ADVICE_BATCH_SIZE,
+    max_wait=env.ADVICE_BATCH_WINDOW_MS / 1000,
+    generation_kwargs=dict(
+        no_repeat_ngram_size=3,
+        do_sample=True,
+        top_k=10,
+        top_p=0.8,
+        temperature=0.5,
+    ),
+)
@@ -0,0 +1,232 @@
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Iterable, Sequence
+
+import numpy as np
+
+# значения черт OCEAN лежат в [0, 1]; индекс хранит их со сдвигом на 0.5,
+# иначе косинус между любыми двумя профилями близок к единице
+CENTER = 0.5
+
+
+class VectorIndex:
+    """
+    Индекс векторов в непрерывном массиве numpy с векторизованным поиском top-k.
+
+    Профиль может быть заполнен частично (например, у вакансии заданы не все
+    черты), поэтому вместе с вектором x хранится маска известных координат m,
+    и сравнение идёт только по координатам, известным у обоих профилей.
+    Строка массива — [x, x², m]: все суммы, из которых складываются метрики,
+    получаются одним матричным произведением на матрицу коэффициентов запроса.
+
+    Массив растёт удвоением; при росте создаётся новый массив, поэтому поиск
+    по ранее взятому снимку безопасен во время обновлений из другого потока.
+
+    Attributes:
+    -----------
+    dim : int
+        Размерность векторов.
+    """
+
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.dim = dim
+
+        self._lock = threading.Lock()
+        self._features = np.zeros((capacity, 3 * dim), dtype=np.float32)
+        self._ids = np.empty(capacity, dtype=object)
+        self._positions: dict[uuid.UUID, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, id: uuid.UUID) -> bool:
+        return id in self._positions
+
+    def _grow(self, size: int) -> None:
+        capacity = len(self._ids)
+        if size <= capacity:
+            return
+
+        while capacity < size:
+            capacity *= 2
+
+        features = np.zeros((capacity, 3 * self.dim), dtype=np.float32)
+        ids = np.empty(capacity, dtype=object)
+        n = len(self._positions)
+        features[:n] = self._features[:n]
+        ids[:n] = self._ids[:n]
+        self._features, self._ids = features, ids
+
+    def update(
+        self,
+        ids: Sequence[uuid.UUID],
+        dims: Sequence[int],
+        values: Sequence[float],
+    ) -> None:
+        """
+        Записывает отдельные координаты профилей: `values[i]` в координату `dims[i]` профиля `ids[i]`.
+
+        Новые профили добавляются, у существующих меняются только переданные
+        координаты, поэтому повторная запись тех же значений ничего не меняет.
+        """
+        with self._lock:
+            positions = np.empty(len(ids), dtype=np.intp)
+            for i, id in enumerate(ids):
+                position = self._positions.get(id)
+                if position is None:
+                    position = len(self._positions)
+                    self._grow(position + 1)
+                    self._positions[id] = position
+                    self._ids[position] = id
+                positions[i] = position
+
+            dims = np.asarray(dims, dtype=np.intp)
+            x = np.asarray(values, dtype=np.float32) - CENTER
+            self._features[positions, dims] = x
+            self._features[positions, dims + self.dim] = x * x
+            self._features[positions, dims + 2 * self.dim] = 1.0
+
+    def get(self, id: uuid.UUID) -> tuple[np.ndarray, np.ndarray] | None:
+        """Возвращает вектор в исходной шкале и маску профиля или None."""
+        with self._lock:
+            position = self._positions.get(id)
+            if position is None:
+                return None
+            row = self._features[position]
+            return row[: self.dim] + CENTER, row[2 * self.dim :].copy()
+
+    def search(
+        self,
+        vector: np.ndarray,
+        mask: np.ndarray | None = None,
+        k: int = 10,
+        metric: str = "distance",
+        weights: np.ndarray | None = None,
+        exclude: Iterable[uuid.UUID] = (),
+    ) -> list[tuple[uuid.UUID, float]]:
+        """
+        Находит k профилей, наиболее близких к `vector`.
+
+        Parameters:
+        -----------
+        vector : np.ndarray
+            Профиль запроса в исходной шкале, форма (dim,).
+        mask : np.ndarray, optional
+            Известные координаты запроса; по умолчанию все.
+        k : int
+            Сколько результатов вернуть.
+        metric : str
+            "distance" — минус взвешенный средний квадрат разности по общим
+            координатам; "cosine" — взвешенный косинус центрированных профилей.
+        weights : np.ndarray, optional
+            Веса координат; по умолчанию равные.
+        exclude : Iterable[uuid.UUID]
+            Профили, которые не попадают в результат.
+
+        Returns:
+        --------
+        list[tuple[uuid.UUID, float]]
+            Пары (id, оценка), от лучшей к худшей; чем больше оценка, тем ближе профиль.
+        """
+        if metric not in ("distance", "cosine"):
+            raise ValueError(f"unknown metric: {metric}")
+
+        with self._lock:
+            n = len(self._positions)
+            features = self._features[:n]
+            ids = self._ids[:n]
+            excluded = [self._positions[id] for id in exclude if id in self._positions]
+
+        if n == 0 or k <= 0:
+            return []
+
+        w = np.ones(self.dim, dtype=np.float32)
+        if weights is not None:
+            w *= np.asarray(weights, dtype=np.float32)
+        if mask is not None:
+            w *= np.asarray(mask, dtype=np.float32)
+        q = (np.asarray(vector, dtype=np.float32) - CENTER) * (w > 0)
+
+        # столбцы результата: Σw·x·q, Σw·x², Σw·m·q², Σw·m
+        coefficients = np.zeros((3 * self.dim, 4), dtype=np.float32)
+        coefficients[: self.dim, 0] = q * w
+        coefficients[self.dim : 2 * self.dim, 1] = w
+        coefficients[2 * self.dim :, 2] = q * q * w
+        coefficients[2 * self.dim :, 3] = w
+        dot, squares, query_squares, shared = (features @ coefficients).T
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if metric == "cosine":
+                scores = dot / np.sqrt(squares * query_squares)
+            else:
+                scores = (2 * dot - squares - query_squares) / shared
+
+        # профили без общих координат с запросом не сравнимы
+        scores[(shared <= 0) | ~np.isfinite(scores)] = -np.inf
+        if excluded:
+            scores[excluded] = -np.inf
+
+        k = min(k, n)
+        top = np.argpartition(scores, n - k)[n - k :]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        top = top[np.isfinite(scores[top])]
+
+        return [(ids[i], float(scores[i])) for i in top]
+
+
+class OceanMatcher:
+    """
+    Пара индексов профилей OCEAN — карточек и вакансий — с общим порядком черт.
+
+    Индексы наполняются строками `PersonalityModel` пачками через `apply` и
+    помнят самый поздний `updated_at`, с которого продолжается синхронизация.
+
+    Attributes:
+    -----------
+    traits : list[str]
+        Черты в порядке координат векторов.
+    watermark : datetime | None
+        Наибольший `updated_at` среди применённых строк.
+    synced_at : float
+        Время последней синхронизации по `time.monotonic`.
+    """
+
+    def __init__(self, traits: Sequence[str]):
+        self.traits = list(traits)
+        self._dims = {trait: i for i, trait in enumerate(self.traits)}
+
+        self.cards = VectorIndex(len(self.traits))
+        self.vacancies = VectorIndex(len(self.traits))
+        self.watermark: datetime | None = None
+        self.synced_at = 0.0
+
+    def apply(self, rows: Iterable[Any]) -> None:
+        """
+        Применяет строки с полями card, vacancy, parameter, confidence, updated_at.
+
+        Строки с чертами вне `traits` пропускаются.
+        """
+        updates = {self.cards: ([], [], []), self.vacancies: ([], [], [])}
+        for row in rows:
+            if self.watermark is None or row.updated_at > self.watermark:
+                self.watermark = row.updated_at
+
+            dim = self._dims.get(row.parameter.lower())
+            if dim is None:
+                continue
+
+            if row.card is not None:
+                ids, dims, values = updates[self.cards]
+                ids.append(row.card)
+            elif row.vacancy is not None:
+                ids, dims, values = updates[self.vacancies]
+                ids.append(row.vacancy)
+            else:
+                continue
+            dims.append(dim)
+            values.append(row.confidence)
+
+        for index, (ids, dims, values) in updates.items():
+            if ids:
+                index.update(ids, dims, values)
@@ -0,0 +1,128 @@
+import functools
+from typing import Any, Iterable
+
+import torch
+from loguru import logger
+from torch import nn
+
+PRECISIONS = ("fp32", "int8", "bf16")
+
+
+def apply_precision(
+    model: nn.Module,
+    precision: str,
+    device,
+    modules: Iterable[nn.Module] | None = None,
+) -> nn.Module:
+    """
+    Переводит загруженную модель в заданный режим точности инференса.
+
+    Параметры
+    ----------
+    model : torch.nn.Module
+        Модель в режиме eval.
+    precision : str
+        "fp32" — без изменений; "int8" — динамическое квантование весов всех
+        линейных слоёв в int8 (только CPU): веса занимают вчетверо меньше
+        памяти, активации квантуются на лету; "bf16" — прямые проходы `modules`
+        выполняются под autocast bfloat16, веса остаются в fp32.
+    device : str
+        Устройство модели.
+    modules : Iterable[torch.nn.Module], optional
+        Модули, чей `forward` оборачивается autocast в режиме "bf16"; по
+        умолчанию сама модель. Нужны для моделей, которые вызывают подмодули
+        напрямую, как декодирование Whisper.
+
+    Возвращает
+    -------
+    torch.nn.Module
+        Та же модель (квантование выполняется на месте).
+
+    Примечания
+    ---------
+    - Под int8 попадают и слои, которые `quantize_dynamic` сам не узнаёт:
+      `Conv1D` из transformers (GPT-2 хранит в нём все проекции) и подкласс
+      `Linear` из whisper. Они заменяются обычными `nn.Linear` с теми же весами.
+    - Выходы обёрнутых в autocast модулей приводятся обратно к float32, чтобы
+      вызывающий код (numpy, CatBoost) не видел bfloat16.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"unknown inference precision: {precision}")
+
+    device_type = torch.device(device).type
+
+    if precision == "int8":
+        if device_type != "cpu":
+            logger.warning(f"int8 quantization is CPU-only, {device} keeps fp32")
+            return model
+
+        _replace_linear_like(model)
+        torch.ao.quantization.quantize_dynamic(
+            model, {nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+
+    if precision == "bf16":
+        for module in modules or [model]:
+            module.forward = _autocast_forward(module.forward, device_type)
+
+    return model
+
+
+def _replace_linear_like(model: nn.Module) -> None:
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            linear = _as_linear(child)
+            if linear is not None:
+                setattr(parent, name, linear)
+
+
+def _as_linear(module: nn.Module) -> nn.Linear | None:
+    cls = type(module)
+
+    if cls.__name__ == "Conv1D" and cls.__module__.startswith("transformers"):
+        # Conv1D хранит веса транспонированными: (in_features, out_features)
+        in_features, out_features = module.weight.shape
+        linear = nn.Linear(in_features, out_features, device="meta")
+        linear.weight = nn.Parameter(module.weight.detach().t().contiguous())
+        linear.bias = module.bias
+        return linear
+
+    if (
+        isinstance(module, nn.Linear)
+        and cls is not nn.Linear
+        and cls.__module__ == "whisper.model"
+    ):
+        linear = nn.Linear(
+            module.in_features, module.out_features, bias=False, device="meta"
+        )
+        linear.weight = module.weight
+        linear.bias = module.bias
+        return linear
+
+    # остальные подклассы Linear (например, out_proj в nn.MultiheadAttention)
+    # используются владельцем напрямую и не заменяются
+    return None
+
+
+def _autocast_forward(forward, device_type: str):
+    @functools.wraps(forward)
+    def wrapper(*args, **kwargs):
+        with torch.autocast(device_type, dtype=torch.bfloat16):
+            output = forward(*args, **kwargs)
+        return _to_float32(output)
+
+    return wrapper
+
+
+def _to_float32(output: Any) -> Any:
+    if isinstance(output, torch.Tensor):
+        return output.float() if output.is_floating_point() else output
+
+    if isinstance(output, dict):
+        # dict-выходы (ImageBind, ModelOutput из transformers) меняются на месте,
+        # чтобы сохранить их тип
+        for key, value in output.items():
+            if isinstance(value, torch.Tensor) and value.is_floating_point():
+                output[key] = value.float()
+
+    return output
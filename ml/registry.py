@@ -0,0 +1,138 @@
+import threading
+import time
+from enum import Enum
+from typing import Any, Callable, Iterable
+
+from loguru import logger
+
+
+class ModelState(Enum):
+    NOT_LOADED = "not_loaded"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+    DISABLED = "disabled"
+
+
+class ModelRegistry:
+    """
+    Реестр моделей, которые загружаются при первом обращении.
+
+    Каждая модель регистрируется функцией-загрузчиком и загружается не более
+    одного раза на процесс. Процесс может отказаться от ненужных ему моделей,
+    передав список `enabled`: обращение к отключённой модели — ошибка.
+
+    Attributes:
+    -----------
+    enabled : set[str] | None
+        Имена моделей, разрешённых в процессе; None — разрешены все.
+    """
+
+    def __init__(self, enabled: Iterable[str] | None = None):
+        self.enabled = None if enabled is None else set(enabled)
+
+        self._loaders: dict[str, Callable[[], Any]] = {}
+        self._memory: dict[str, Callable[[Any], dict[str, int]]] = {}
+        self._models: dict[str, Any] = {}
+        self._states: dict[str, ModelState] = {}
+        self._errors: dict[str, str] = {}
+        self._load_seconds: dict[str, float] = {}
+        self._locks: dict[str, threading.Lock] = {}
+
+    def register(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        memory: Callable[[Any], dict[str, int]] | None = None,
+    ) -> None:
+        """
+        Регистрирует загрузчик модели.
+
+        `memory` по загруженной модели возвращает байты её частей; результат
+        попадает в `status`.
+        """
+        self._loaders[name] = loader
+        if memory is not None:
+            self._memory[name] = memory
+        self._locks[name] = threading.Lock()
+        self._states[name] = (
+            ModelState.NOT_LOADED
+            if self.enabled is None or name in self.enabled
+            else ModelState.DISABLED
+        )
+
+    def get(self, name: str) -> Any:
+        state = self._states[name]
+        if state is ModelState.READY:
+            return self._models[name]
+
+        if state is ModelState.DISABLED:
+            raise RuntimeError(f"model {name} is disabled in this process")
+
+        with self._locks[name]:
+            # модель могла загрузиться, пока мы ждали блокировку
+            if self._states[name] is ModelState.READY:
+                return self._models[name]
+
+            logger.info(f"loading {name}")
+            self._states[name] = ModelState.LOADING
+            started = time.monotonic()
+            try:
+                model = self._loaders[name]()
+            except Exception as e:
+                self._states[name] = ModelState.FAILED
+                self._errors[name] = str(e)
+                raise
+
+            self._models[name] = model
+            self._load_seconds[name] = time.monotonic() - started
+            self._states[name] = ModelState.READY
+            self._errors.pop(name, None)
+            logger.info(f"loaded {name} in {self._load_seconds[name]:.1f}s")
+            return model
+
+    def preload(
+        self, names: Iterable[str] | None = None, background: bool = True
+    ) -> threading.Thread | None:
+        """Загружает модели заранее: в фоновом потоке или в текущем."""
+        names = [
+            name
+            for name in (self._loaders if names is None else names)
+            if self._states[name] is not ModelState.DISABLED
+        ]
+
+        def load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception:
+                    logger.exception(f"cannot load {name}")
+
+        if not background:
+            load_all()
+            return None
+
+        thread = threading.Thread(target=load_all, name="model-preload", daemon=True)
+        thread.start()
+        return thread
+
+    def is_ready(self) -> bool:
+        return all(
+            state in (ModelState.READY, ModelState.DISABLED)
+            for state in self._states.values()
+        )
+
+    def status(self) -> dict[str, dict[str, Any]]:
+        return {
+            name: {
+                "state": state.value,
+                "load_seconds": self._load_seconds.get(name),
+                "error": self._errors.get(name),
+                "memory_bytes": (
+                    self._memory[name](self._models[name])
+                    if state is ModelState.READY and name in self._memory
+                    else None
+                ),
+            }
+            for name, state in self._states.items()
+        }
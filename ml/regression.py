@@ -0,0 +1,189 @@
+"""
+Проверка точности режимов инференса по сохранённому эталону.
+
+Запуск:
+
+    python -m ml.regression record samples/ ml/models/precision_reference.npz
+    python -m ml.regression check samples/ ml/models/precision_reference.npz --precision int8
+
+`record` прогоняет видео из каталога в режиме fp32 и сохраняет транскрипции,
+эмбеддинги аудио и текста и предсказания OCEAN. `check` считает то же самое в
+режиме `--precision` и сравнивает с эталоном:
+
+- эмбеддинги — по косинусной близости (`--min-cosine`);
+- OCEAN — по наибольшему абсолютному отклонению (`--max-ocean-diff`);
+- транскрипции — по доле совпадающих символов (`--min-transcript-ratio`).
+
+Текстовый эмбеддинг в `check` считается по эталонной транскрипции, чтобы
+отклонение Whisper не смешивалось с отклонением текстовой ветки ImageBind.
+Команда завершается с кодом 1, если хотя бы одна метрика хуже порога.
+"""
+
+import argparse
+import difflib
+import os
+import sys
+
+import numpy as np
+from loguru import logger
+
+from ml.precision import PRECISIONS
+
+
+def _load_service(precision: str):
+    # режим точности читается из окружения при загрузке моделей, а кэш
+    # эмбеддингов отключается, чтобы сравнивались свежие результаты
+    os.environ["INFERENCE_PRECISION"] = precision
+    os.environ["EMBEDDING_CACHE_DIR"] = ""
+    os.environ["EMBEDDING_CACHE_MEMORY_MB"] = "0"
+
+    from services.ml import MlService
+
+    return MlService()
+
+
+def _videos(directory: str) -> list[str]:
+    return sorted(
+        name for name in os.listdir(directory) if name.lower().endswith(".mp4")
+    )
+
+
+def compute(
+    directory: str, names: list[str], precision: str, transcripts: list[str] | None
+) -> dict[str, np.ndarray]:
+    """
+    Считает транскрипции, эмбеддинги и OCEAN для видео `names` в режиме `precision`.
+
+    Если переданы `transcripts`, текстовые эмбеддинги считаются по ним.
+    """
+    service = _load_service(precision)
+
+    result = {"transcripts": [], "audio": [], "text": []}
+    for i, name in enumerate(names):
+        with open(os.path.join(directory, name), "rb") as f:
+            audio = service.prepare_audio(f.read())
+
+        transcript = service.transcript_video(audio)
+        text = transcripts[i] if transcripts is not None else transcript
+
+        result["transcripts"].append(transcript)
+        result["audio"].append(service._extract_audio_embedding(audio).reshape(-1))
+        result["text"].append(service._extract_text_embedding(text).reshape(-1))
+        logger.info(f"Regression - {precision} - {name}")
+
+    audio = np.stack(result["audio"]).astype(np.float32)
+    text = np.stack(result["text"]).astype(np.float32)
+    scores = service.score_batch({"audio_embedding": audio, "text_embedding": text})
+
+    return {
+        "names": np.array(names),
+        "transcripts": np.array(result["transcripts"]),
+        "audio": audio,
+        "text": text,
+        "labels": np.array(list(scores[0])),
+        "ocean": np.array([list(score.values()) for score in scores]),
+    }
+
+
+def _cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.sum(a * b, axis=1) / (
+        np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1) + 1e-12
+    )
+
+
+def compare(reference: dict, current: dict) -> dict[str, float]:
+    """Возвращает худшие по набору видео значения метрик."""
+    ratios = [
+        difflib.SequenceMatcher(None, expected, actual).ratio()
+        for expected, actual in zip(reference["transcripts"], current["transcripts"])
+    ]
+    return {
+        "audio_cosine": float(_cosine(reference["audio"], current["audio"]).min()),
+        "text_cosine": float(_cosine(reference["text"], current["text"]).min()),
+        "ocean_diff": float(np.abs(reference["ocean"] - current["ocean"]).max()),
+        "transcript_ratio": float(min(ratios)),
+    }
+
+
+def record(directory: str, reference_path: str) -> None:
+    names = _videos(directory)
+    if not names:
+        raise ValueError(f"no .mp4 files in {directory}")
+
+    reference = compute(directory, names, "fp32", None)
+    np.savez(reference_path, **reference)
+    logger.info(f"Regression - recorded {len(names)} videos to {reference_path}")
+
+
+def check(
+    directory: str,
+    reference_path: str,
+    precision: str,
+    min_cosine: float,
+    max_ocean_diff: float,
+    min_transcript_ratio: float,
+) -> bool:
+    with np.load(reference_path) as stored:
+        reference = {key: stored[key] for key in stored.files}
+
+    names = [str(name) for name in reference["names"]]
+    current = compute(
+        directory, names, precision, [str(t) for t in reference["transcripts"]]
+    )
+    if list(current["labels"]) != list(reference["labels"]):
+        raise ValueError("reference was recorded for another set of OCEAN labels")
+
+    metrics = compare(reference, current)
+    failures = [
+        name
+        for name, failed in (
+            ("audio_cosine", metrics["audio_cosine"] < min_cosine),
+            ("text_cosine", metrics["text_cosine"] < min_cosine),
+            ("ocean_diff", metrics["ocean_diff"] > max_ocean_diff),
+            ("transcript_ratio", metrics["transcript_ratio"] < min_transcript_ratio),
+        )
+        if failed
+    ]
+
+    logger.info(f"Regression - {precision} - {metrics}")
+    if failures:
+        logger.error(f"Regression - {precision} - failed: {', '.join(failures)}")
+    return not failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Record fp32 reference outputs or check another precision against them."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="record fp32 reference")
+    record_parser.add_argument("videos", help="directory with .mp4 files")
+    record_parser.add_argument("reference", help="output .npz file")
+
+    check_parser = subparsers.add_parser("check", help="check a precision mode")
+    check_parser.add_argument("videos", help="directory with the recorded .mp4 files")
+    check_parser.add_argument("reference", help=".npz file written by record")
+    check_parser.add_argument("--precision", default="int8", choices=PRECISIONS)
+    check_parser.add_argument("--min-cosine", type=float, default=0.99)
+    check_parser.add_argument("--max-ocean-diff", type=float, default=0.02)
+    check_parser.add_argument("--min-transcript-ratio", type=float, default=0.9)
+
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args.videos, args.reference)
+        return
+
+    passed = check(
+        args.videos,
+        args.reference,
+        args.precision,
+        args.min_cosine,
+        args.max_ocean_diff,
+        args.min_transcript_ratio,
+    )
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import os
+from typing import Iterable
+
+import numpy as np
+import torch
+from loguru import logger
+
+BACKENDS = ("torch", "onnx", "torchscript")
+
+EXPORT_SUFFIXES = {"onnx": ".onnx", "torchscript": ".pt"}
+
+
+def export_path(directory: str, modality: str, backend: str) -> str:
+    """Путь графа модальности ImageBind, который пишет `ml.export` и читает `ExportedImageBind`."""
+    return os.path.join(directory, f"{modality}{EXPORT_SUFFIXES[backend]}")
+
+
+def intra_op_threads(processes: int, threads: int = 0) -> int:
+    """Число потоков внутри оператора: явное значение или ядра, поделённые между процессами пула."""
+    if threads > 0:
+        return threads
+    return max(1, (os.cpu_count() or 1) // max(processes, 1))
+
+
+class ExportedImageBind:
+    """
+    Экспортированные энкодеры модальностей ImageBind с интерфейсом исходной модели.
+
+    Вызов принимает и возвращает словарь {модальность: тензор}, как
+    `imagebind_huge`, поэтому батчеры и `MlService` не зависят от бэкенда.
+    Каждая модальность — отдельный граф из `ml.export`: сессия ONNX Runtime
+    или модуль TorchScript.
+
+    Attributes:
+    -----------
+    backend : str
+        "onnx" или "torchscript".
+    modalities : list[str]
+        Загруженные модальности.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        backend: str,
+        modalities: Iterable[str],
+        device,
+        threads: int,
+    ):
+        if backend not in EXPORT_SUFFIXES:
+            raise ValueError(f"unknown exported backend: {backend}")
+
+        self.backend = backend
+        self.modalities = list(modalities)
+        self._device = device
+
+        if backend == "onnx":
+            self._encoders = self._load_onnx(directory, threads)
+        else:
+            torch.set_num_threads(threads)
+            self._encoders = {
+                modality: torch.jit.load(
+                    export_path(directory, modality, backend), map_location=device
+                ).eval()
+                for modality in self.modalities
+            }
+
+        logger.info(
+            f"ML - Runtime - {backend} encoders for {', '.join(self.modalities)}, {threads} threads"
+        )
+
+    def _load_onnx(self, directory: str, threads: int) -> dict:
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError(
+                "ML_BACKEND=onnx requires onnxruntime: poetry install --extras onnx"
+            ) from e
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        # пакет обрабатывается одним графом; параллелизм между узлами только
+        # отнимал бы ядра у матричных умножений
+        options.inter_op_num_threads = 1
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = (
+            onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+
+        providers = ["CPUExecutionProvider"]
+        if torch.device(self._device).type == "cuda":
+            providers.insert(0, "CUDAExecutionProvider")
+
+        return {
+            modality: onnxruntime.InferenceSession(
+                export_path(directory, modality, "onnx"), options, providers=providers
+            )
+            for modality in self.modalities
+        }
+
+    def __call__(self, inputs: dict[str, torch.Tensor]) -> dict[str, torch.Tensor]:
+        outputs = {}
+        for modality, value in inputs.items():
+            encoder = self._encoders.get(modality)
+            if encoder is None:
+                raise KeyError(f"modality {modality} was not exported")
+
+            if self.backend == "onnx":
+                (embedding,) = encoder.run(None, {"input": value.cpu().numpy()})
+                outputs[modality] = torch.from_numpy(np.asarray(embedding)).to(
+                    self._device
+                )
+            else:
+                outputs[modality] = encoder(value.to(self._device))
+
+        return outputs
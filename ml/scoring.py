@@ -0,0 +1,96 @@
+from typing import Iterator, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+from catboost import Pool
+
+from ml.constants import LABEL_NAMES, EMBEDDING_FEATURES
+
+
+class OceanScorer:
+    """
+    Предсказывает черты OCEAN моделями CatBoost сразу для набора карточек.
+
+    Матрица признаков собирается один раз в непрерывный массив float32, по ней
+    строится единственный `Pool`, который переиспользуют модели всех меток.
+
+    Attributes:
+    -----------
+    label_names : list[str]
+        Порядок меток в столбцах результата `score_batch`.
+    embedding_features : list[str]
+        Порядок эмбеддингов в матрице признаков.
+    """
+
+    def __init__(
+        self,
+        models: Mapping,
+        label_names: Sequence[str] = LABEL_NAMES,
+        embedding_features: Sequence[str] = EMBEDDING_FEATURES,
+    ):
+        self._models = models
+        self.label_names = list(label_names)
+        self.embedding_features = list(embedding_features)
+
+    def _build_pool(self, embeddings: Mapping[str, np.ndarray]) -> Pool:
+        """Собирает один Pool по матрице признаков формы (N, сумма размерностей эмбеддингов)."""
+        blocks = [
+            np.asarray(embeddings[feature], dtype=np.float32).reshape(
+                -1, np.shape(embeddings[feature])[-1]
+            )
+            for feature in self.embedding_features
+        ]
+        if len({block.shape[0] for block in blocks}) != 1:
+            raise ValueError("all embeddings must have the same number of rows")
+
+        matrix = np.ascontiguousarray(np.concatenate(blocks, axis=1))
+
+        # ячейки DataFrame — представления строк матрицы, данные не копируются
+        columns = {}
+        offset = 0
+        for feature, block in zip(self.embedding_features, blocks):
+            width = block.shape[1]
+            columns[feature] = list(matrix[:, offset : offset + width])
+            offset += width
+
+        return Pool(
+            data=pd.DataFrame(columns), embedding_features=self.embedding_features
+        )
+
+    def score_batch(self, embeddings: Mapping[str, np.ndarray]) -> np.ndarray:
+        """
+        Предсказывает все метки для N карточек.
+
+        Parameters:
+        -----------
+        embeddings : Mapping[str, np.ndarray]
+            Эмбеддинги по именам из `embedding_features`, каждый формы (N, D).
+
+        Returns:
+        --------
+        np.ndarray
+            Матрица предсказаний формы (N, len(label_names)).
+        """
+        columns = [column for _, column in self.iter_scores(embeddings)]
+
+        return np.stack(columns, axis=1).astype(np.float64, copy=False)
+
+    def iter_scores(
+        self, embeddings: Mapping[str, np.ndarray]
+    ) -> Iterator[tuple[str, np.ndarray]]:
+        """
+        Выдаёт предсказания по одной метке в порядке `label_names`.
+
+        Pool строится один раз перед первой меткой; каждая следующая метка
+        предсказывается только после того, как потребитель забрал предыдущую.
+        """
+        pool = self._build_pool(embeddings)
+
+        for label_name in self.label_names:
+            yield label_name, self._models[label_name].predict(pool)
+
+    def to_dicts(self, scores: np.ndarray) -> list[dict[str, float]]:
+        """Преобразует матрицу `score_batch` в словари {метка: значение}."""
+        return [
+            dict(zip(self.label_names, row)) for row in scores.astype(float).tolist()
+        ]
@@ -0,0 +1,267 @@
+from typing import Any, Iterator, Sequence
+
+import numpy as np
+import torch
+from loguru import logger
+
+from ml.constants import SAMPLE_RATE
+
+# длина окна энкодера Whisper; более длинные отрезки речи режутся на окна
+WINDOW_SECONDS = 30
+
+# шаг временных меток Whisper в секундах
+TIMESTAMP_STEP = 0.02
+
+
+def detect_speech(
+    waveform: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    frame_ms: int = 30,
+    threshold_db: float = -45.0,
+    noise_margin_db: float = 10.0,
+    max_noise_db: float = -35.0,
+    min_speech_s: float = 0.25,
+    min_silence_s: float = 0.5,
+    padding_s: float = 0.2,
+) -> list[tuple[int, int]]:
+    """
+    Находит отрезки речи по энергии сигнала.
+
+    Сигнал режется на кадры по `frame_ms`, для каждого считается RMS в дБ
+    относительно полной шкалы. Кадр считается речью, если он громче и
+    абсолютного порога `threshold_db`, и оценки шума (5-й перцентиль энергии)
+    на `noise_margin_db`. Оценка шума ограничена сверху `max_noise_db`: если
+    речь или музыкальная подложка заполняют почти все кадры, перцентиль
+    попадает на саму речь, и без ограничения порог отрезал бы тихие слоги и
+    целые фразы. Паузы короче `min_silence_s` склеиваются, отрезки
+    короче `min_speech_s` отбрасываются, к краям добавляется `padding_s`, чтобы
+    не обрезать начала и концы слов.
+
+    Параметры
+    ----------
+    waveform : numpy.ndarray
+        Моно-сигнал float32 в диапазоне [-1, 1].
+    sample_rate : int, optional
+        Частота дискретизации сигнала.
+
+    Возвращает
+    -------
+    list[tuple[int, int]]
+        Отрезки речи [start, end) в отсчётах, упорядоченные по времени.
+    """
+    frame = max(1, sample_rate * frame_ms // 1000)
+    n_frames = len(waveform) // frame
+    if n_frames == 0:
+        return []
+
+    frames = waveform[: n_frames * frame].reshape(n_frames, frame)
+    energy = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    noise = min(np.percentile(energy, 5), max_noise_db)
+    threshold = max(threshold_db, noise + noise_margin_db)
+    voiced = energy > threshold
+
+    # границы участков речи по смене знака маски
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], voiced.astype(np.int8), [0]))))
+    runs = edges.reshape(-1, 2)
+
+    min_silence = int(min_silence_s * 1000 / frame_ms)
+    merged: list[list[int]] = []
+    for start, end in runs:
+        if merged and start - merged[-1][1] < min_silence:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    min_speech = int(min_speech_s * 1000 / frame_ms)
+    padding = int(padding_s * sample_rate)
+    segments = []
+    for start, end in merged:
+        if end - start < min_speech:
+            continue
+        start = max(0, start * frame - padding)
+        end = min(len(waveform), end * frame + padding)
+        if segments and start <= segments[-1][1]:
+            segments[-1] = (segments[-1][0], int(end))
+        else:
+            segments.append((int(start), int(end)))
+
+    return segments
+
+
+def split_windows(
+    segments: Sequence[tuple[int, int]], sample_rate: int = SAMPLE_RATE
+) -> list[tuple[int, int]]:
+    """Режет отрезки речи на окна не длиннее `WINDOW_SECONDS`."""
+    window = WINDOW_SECONDS * sample_rate
+    return [
+        (offset, min(offset + window, end))
+        for start, end in segments
+        for offset in range(start, end, window)
+    ]
+
+
+def join_segments(segments: Sequence[dict[str, Any]]) -> str:
+    """Склеивает текст сегментов в полную транскрипцию."""
+    return " ".join(segment["text"] for segment in segments if segment["text"])
+
+
+class WhisperTranscriber:
+    """
+    Расшифровывает только речь: окна с речью декодируются пакетами.
+
+    В отличие от `whisper.transcribe`, который последовательно проходит всё
+    аудио 30-секундными окнами, тишина отбрасывается `detect_speech` ещё до
+    модели, а оставшиеся окна идут через энкодер и декодер Whisper пакетами по
+    `batch_size`. Временные метки окон сдвигаются на их начало в исходном
+    сигнале, поэтому сегменты результата привязаны ко времени видео.
+
+    Attributes:
+    -----------
+    batch_size : int
+        Сколько окон декодируется за один проход.
+    vad : bool
+        Отбрасывать ли тишину; без VAD окна покрывают весь сигнал подряд.
+    """
+
+    # пороги повторного декодирования и отбрасывания тишины — как в whisper.transcribe
+    TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+    COMPRESSION_RATIO_THRESHOLD = 2.4
+    LOGPROB_THRESHOLD = -1.0
+    NO_SPEECH_THRESHOLD = 0.6
+
+    # если VAD оставил меньшую долю сигнала, он скорее ошибся, чем видео молчит
+    MIN_SPEECH_SHARE = 0.1
+
+    def __init__(self, model, batch_size: int = 8, vad: bool = True):
+        self._model = model
+        self.batch_size = batch_size
+        self.vad = vad
+
+    def transcribe(self, waveform: np.ndarray) -> dict[str, Any]:
+        """
+        Расшифровывает сигнал 16 кГц.
+
+        Результат устроен как у `whisper.transcribe`: полный текст в "text" и
+        список сегментов с ключами "start", "end" (секунды от начала сигнала)
+        и "text" в "segments".
+        """
+        segments = list(self.iter_segments(waveform))
+        return {"text": join_segments(segments), "segments": segments}
+
+    def iter_segments(self, waveform: np.ndarray) -> Iterator[dict[str, Any]]:
+        """Выдаёт сегменты по мере декодирования пакетов окон, в порядке времени."""
+        speech = [(0, len(waveform))] if len(waveform) else []
+        if self.vad and speech:
+            detected = detect_speech(waveform)
+            share = sum(end - start for start, end in detected) / len(waveform)
+            if share >= self.MIN_SPEECH_SHARE:
+                speech = detected
+            else:
+                logger.debug(
+                    f"ML - Transcription - VAD kept {share:.0%} of the signal, "
+                    "decoding all of it"
+                )
+        windows = split_windows(speech)
+
+        speech_seconds = sum(end - start for start, end in windows) / SAMPLE_RATE
+        logger.debug(
+            f"ML - Transcription - {speech_seconds:.1f}s of speech "
+            f"in {len(waveform) / SAMPLE_RATE:.1f}s, {len(windows)} windows"
+        )
+
+        for i in range(0, len(windows), self.batch_size):
+            batch = windows[i : i + self.batch_size]
+            results = self._decode([waveform[start:end] for start, end in batch])
+            for (start, end), result in zip(batch, results):
+                if result is None:
+                    continue
+                yield from self._segments(
+                    result, start / SAMPLE_RATE, (end - start) / SAMPLE_RATE
+                )
+
+    def _decode(self, chunks: list[np.ndarray]) -> list:
+        import whisper
+
+        model = self._model
+        mel = torch.stack(
+            [
+                whisper.log_mel_spectrogram(
+                    whisper.pad_or_trim(torch.from_numpy(chunk)), model.dims.n_mels
+                )
+                for chunk in chunks
+            ]
+        ).to(model.device)
+
+        results: list = [None] * len(chunks)
+        pending = list(range(len(chunks)))
+        for temperature in self.TEMPERATURES:
+            options = whisper.DecodingOptions(
+                task="transcribe",
+                temperature=temperature,
+                fp16=model.device.type == "cuda",
+            )
+            decoded = whisper.decode(model, mel[pending], options)
+
+            retry = []
+            for index, result in zip(pending, decoded):
+                results[index] = result
+                needs_fallback = (
+                    result.compression_ratio > self.COMPRESSION_RATIO_THRESHOLD
+                    or result.avg_logprob < self.LOGPROB_THRESHOLD
+                )
+                # тишину не декодируют заново: большая температура только
+                # выдумала бы текст
+                if result.no_speech_prob > self.NO_SPEECH_THRESHOLD:
+                    needs_fallback = False
+                if needs_fallback:
+                    retry.append(index)
+            # окна, которые не прошли проверку, декодируются заново с большей температурой
+            if not retry:
+                break
+            pending = retry
+
+        return [
+            (
+                None
+                if result.no_speech_prob > self.NO_SPEECH_THRESHOLD
+                and result.avg_logprob < self.LOGPROB_THRESHOLD
+                else result
+            )
+            for result in results
+        ]
+
+    def _segments(self, result, offset: float, duration: float) -> list[dict[str, Any]]:
+        from whisper.tokenizer import get_tokenizer
+
+        tokenizer = get_tokenizer(
+            self._model.is_multilingual,
+            num_languages=self._model.num_languages,
+            language=result.language,
+            task="transcribe",
+        )
+        timestamp_begin = tokenizer.timestamp_begin
+
+        # между парами временных меток лежит текст одного сегмента
+        segments = []
+        start, tokens = 0.0, []
+        for token in result.tokens:
+            if token < timestamp_begin:
+                tokens.append(token)
+                continue
+
+            time = (token - timestamp_begin) * TIMESTAMP_STEP
+            if tokens:
+                segments.append((start, time, tokens))
+                tokens = []
+            start = time
+        if tokens:
+            segments.append((start, duration, tokens))
+
+        return [
+            {
+                "start": offset + start,
+                "end": offset + min(end, duration),
+                "text": tokenizer.decode(tokens).strip(),
+            }
+            for start, end, tokens in segments
+        ]
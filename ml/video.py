@@ -0,0 +1,162 @@
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator
+
+import numpy as np
+import torch
+
+# нормализация CLIP, с которой обучалась визуальная ветка ImageBind
+VISION_MEAN = np.array([0.48145466, 0.4578275, 0.40821073], dtype=np.float32)
+VISION_STD = np.array([0.26862954, 0.26130258, 0.27577711], dtype=np.float32)
+
+# веса яркости ITU-R 601-2, как в torchvision.transforms.Grayscale
+GRAYSCALE_WEIGHTS = np.array([0.2989, 0.587, 0.114], dtype=np.float32)
+
+
+@contextmanager
+def _video_path(video: bytes | str) -> Iterator[str]:
+    # MP4 с индексом в конце файла нельзя читать из pipe, поэтому байты
+    # кладутся во временный файл, который удаляется при выходе
+    if isinstance(video, str):
+        yield video
+        return
+
+    with tempfile.NamedTemporaryFile(suffix=".mp4") as container:
+        container.write(video)
+        container.flush()
+        yield container.name
+
+
+def probe_duration(path: str) -> float:
+    """Возвращает длительность видео в секундах по заголовку контейнера (0, если она неизвестна)."""
+    output = subprocess.run(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-show_entries",
+            "format=duration",
+            "-of",
+            "default=noprint_wrappers=1:nokey=1",
+            path,
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout.strip()
+
+    try:
+        return float(output)
+    except ValueError:
+        return 0.0
+
+
+def decode_frames(
+    video: bytes | str,
+    fps: float = 0.5,
+    max_frames: int = 16,
+    keyframes: bool = False,
+    size: int = 224,
+) -> np.ndarray:
+    """
+    Выбирает кадры видео с заданной частотой и декодирует их в RGB заданного размера.
+
+    Параметры
+    ----------
+    video : bytes | str
+        Содержимое видеофайла или путь к нему.
+    fps : float, optional
+        Частота выборки кадров. Для длинных видео снижается так, чтобы
+        `max_frames` кадров равномерно покрывали всё видео.
+    max_frames : int, optional
+        Максимальное число кадров; под них заранее выделяется буфер.
+    keyframes : bool, optional
+        Декодировать только ключевые кадры. Остальные кадры декодер пропускает
+        целиком, что в разы быстрее, но выборка привязана к GOP кодека.
+    size : int, optional
+        Сторона квадратного кадра на выходе.
+
+    Возвращает
+    -------
+    numpy.ndarray
+        Массив uint8 формы (N, size, size, 3), N <= max_frames.
+
+    Примечания
+    ---------
+    - ffmpeg запускается один раз: выборка и масштабирование выполняются его
+      фильтрами, в Python приходят только нужные кадры.
+    - Кадры читаются из stdout сразу в предвыделенный буфер без промежуточных
+      копий; возвращается представление его заполненной части.
+    """
+    buffer = np.empty((max_frames, size, size, 3), dtype=np.uint8)
+    view = memoryview(buffer).cast("B")
+
+    with _video_path(video) as path:
+        duration = probe_duration(path)
+        if duration > 0:
+            fps = min(fps, max_frames / duration)
+
+        command = ["ffmpeg", "-nostdin", "-threads", "0", "-loglevel", "error"]
+        if keyframes:
+            command += ["-skip_frame", "nokey"]
+        command += [
+            "-i",
+            path,
+            "-an",
+            "-vf",
+            f"fps={fps},scale={size}:{size}:flags=bilinear",
+            "-vsync",
+            "vfr",
+            "-frames:v",
+            str(max_frames),
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            "rgb24",
+            "-",
+        ]
+
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        filled = 0
+        while filled < len(view):
+            read = process.stdout.readinto(view[filled:])
+            if not read:
+                break
+            filled += read
+
+        _, stderr = process.communicate()
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(
+                process.returncode, command, stderr=stderr
+            )
+
+    return buffer[: filled // (size * size * 3)]
+
+
+def frames_to_tensor(frames: np.ndarray, device) -> torch.Tensor:
+    """
+    Готовит вход визуальной модальности ImageBind сразу для всех кадров.
+
+    Кадры переводятся в оттенки серого, повторяются на три канала и
+    нормализуются векторными операциями над всем буфером, как это делал
+    покадровый `transforms.Compose` в `load_and_transform_video_data`.
+
+    Параметры
+    ----------
+    frames : numpy.ndarray
+        Кадры uint8 формы (N, H, W, 3) из `decode_frames`.
+    device : torch.device
+        Устройство, на которое переносится результат.
+
+    Возвращает
+    -------
+    torch.Tensor
+        Тензор float32 формы (N, 3, H, W).
+    """
+    gray = frames @ (GRAYSCALE_WEIGHTS / 255.0)
+    normalized = (gray[:, None] - VISION_MEAN[:, None, None]) / VISION_STD[:, None, None]
+
+    return torch.from_numpy(normalized.astype(np.float32, copy=False)).to(device)
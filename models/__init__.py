@@ -1 +1 @@
-from . import user, card, personality_model, vacancy
+from . import user, card, personality_model, vacancy, job
@@ -1,6 +1,7 @@
 import uuid
 from datetime import datetime
 
+from sqlalchemy import Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from models.BaseModel import EntityMeta
@@ -9,6 +10,8 @@ from models.personality_model import PersonalityModel
 
 class Card(EntityMeta):
     __tablename__ = "card"
+    __table_args__ = (Index("ix_card_created_at_id", "created_at", "id"),)
+
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
 
     video_path: Mapped[str] = mapped_column(nullable=True)
@@ -18,6 +21,13 @@ class Card(EntityMeta):
 
     motivation_letter: Mapped[str] = mapped_column(nullable=True)
 
+    # совет генерируется один раз после оценки и хранится вместе с промптом
+    # и моделью, которыми он получен
+    advice: Mapped[str] = mapped_column(nullable=True)
+    advice_prompt: Mapped[str] = mapped_column(nullable=True)
+    advice_model: Mapped[str] = mapped_column(nullable=True)
+    advice_generated_at: Mapped[datetime] = mapped_column(nullable=True)
+
     personality_models: Mapped[list["PersonalityModel"]] = relationship()
 
     created_at: Mapped[datetime] = mapped_column(default=datetime.now, nullable=False)
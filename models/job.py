@@ -0,0 +1,23 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from models.BaseModel import EntityMeta
+
+
+class Job(EntityMeta):
+    __tablename__ = "job"
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
+
+    kind: Mapped[str] = mapped_column(default="process")  # process or advice
+    status: Mapped[str]  # pending, processing, done or failed
+    error: Mapped[str] = mapped_column(nullable=True)
+
+    card: Mapped[uuid.UUID] = mapped_column(ForeignKey("card.id"))
+
+    created_at: Mapped[datetime] = mapped_column(default=datetime.now, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        default=datetime.now, onupdate=datetime.now, nullable=False
+    )
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column
 
 from models.BaseModel import EntityMeta
@@ -9,6 +9,10 @@ from models.BaseModel import EntityMeta
 
 class PersonalityModel(EntityMeta):
     __tablename__ = "personality_model"
+    __table_args__ = (
+        Index("ix_personality_model_model_updated_at", "model", "updated_at"),
+    )
+
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
 
     model: Mapped[str]  # the name of the personality test, e.g OCEAN
@@ -1,5 +1,7 @@
 import uuid
+from datetime import datetime
 
+from sqlalchemy import Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from models.BaseModel import EntityMeta
@@ -8,6 +10,8 @@ from models.personality_model import PersonalityModel
 
 class Vacancy(EntityMeta):
     __tablename__ = "vacancy"
+    __table_args__ = (Index("ix_vacancy_created_at_id", "created_at", "id"),)
+
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
 
     title: Mapped[str]
@@ -16,3 +20,8 @@ class Vacancy(EntityMeta):
     salary: Mapped[int]
 
     personality_models: Mapped[list["PersonalityModel"]] = relationship()
+
+    created_at: Mapped[datetime] = mapped_column(default=datetime.now, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        default=datetime.now, onupdate=datetime.now, nullable=False
+    )
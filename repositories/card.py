@@ -1,5 +1,6 @@
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from configs.Database import get_db_connection
 from models.card import Card
@@ -8,4 +9,4 @@ from repositories.mixins.crud import CRUDRepositoryMixin
 
 class CardRepository(CRUDRepositoryMixin):
     def __init__(self, db: AsyncSession = Depends(get_db_connection)):
-        super().__init__(Card, db)
+        super().__init__(Card, db, (selectinload(Card.personality_models),))
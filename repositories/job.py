@@ -0,0 +1,35 @@
+import uuid
+
+from fastapi import Depends
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from configs.Database import get_db_connection
+from errors.errors import ErrEntityNotFound
+from models.job import Job
+from repositories.mixins.crud import CRUDRepositoryMixin
+
+
+class JobRepository(CRUDRepositoryMixin):
+    def __init__(self, db: AsyncSession = Depends(get_db_connection)):
+        super().__init__(Job, db)
+
+    async def update_status(
+        self, id: uuid.UUID, status: str, error: str | None = None
+    ) -> Job:
+        logger.debug("Job - Repository - update_status")
+        job = await self.get(id)
+        job.status = status
+        job.error = error
+        return await self.update(job)
+
+    async def get_status(self, id: uuid.UUID) -> Job:
+        logger.debug("Job - Repository - get_status")
+        # задача перечитывается из базы, а не берётся из identity map, и
+        # транзакция сразу закрывается: поток событий держит сессию долго и
+        # не должен занимать соединение пула
+        job = await self._db.get(Job, id, populate_existing=True)
+        if job is None:
+            raise ErrEntityNotFound("Job not found")
+        await self._db.commit()
+        return job
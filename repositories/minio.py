@@ -1,19 +1,42 @@
+import asyncio
+import functools
 import io
+from concurrent.futures import Executor
+from typing import Any, BinaryIO, Callable, Sequence
 
 from fastapi import Depends
 from loguru import logger
 
 from configs import Minio
-from configs.Minio import get_minio_client, base_bucket
+from configs.Minio import (
+    get_minio_client,
+    get_minio_executor,
+    get_url_signer,
+    base_bucket,
+)
 from schemas.minio import MinioContentType
+from utils.presign import PresignedUrlSigner
 
 
 class MinioRepository:
-    def __init__(self, client: Minio = Depends(get_minio_client)):
+    def __init__(
+        self,
+        client: Minio = Depends(get_minio_client),
+        signer: PresignedUrlSigner = Depends(get_url_signer),
+        executor: Executor = Depends(get_minio_executor),
+    ):
         self._client = client
-        self.create_bucket(base_bucket)
+        self._signer = signer
+        self._executor = executor
+
+    async def _run(self, func: Callable, *args, **kwargs) -> Any:
+        # клиент minio синхронный: сетевые вызовы уходят в отдельный
+        # ограниченный пул потоков, а не в event loop и не в пул Starlette
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
 
-    def create_object_from_byte(
+    async def create_object_from_byte(
         self,
         object_path: str,
         file: io.BytesIO,
@@ -21,7 +44,8 @@ class MinioRepository:
         bucket_name: str = base_bucket,
     ) -> str:
         logger.debug("Minio - Repository - create_object_from_byte")
-        self._client.put_object(
+        await self._run(
+            self._client.put_object,
             bucket_name,
             object_path,
             data=file,
@@ -31,7 +55,32 @@ class MinioRepository:
 
         return object_path
 
-    def create_object_from_file(
+    async def create_object_from_stream(
+        self,
+        object_path: str,
+        stream: BinaryIO,
+        content_type: MinioContentType,
+        part_size: int,
+        num_parallel_uploads: int = 1,
+        bucket_name: str = base_bucket,
+    ) -> str:
+        logger.debug("Minio - Repository - create_object_from_stream")
+        # длина неизвестна: клиент читает поток частями по part_size и грузит
+        # их как multipart upload, не держа весь файл в памяти
+        await self._run(
+            self._client.put_object,
+            bucket_name,
+            object_path,
+            data=stream,
+            length=-1,
+            content_type=content_type.value,
+            part_size=part_size,
+            num_parallel_uploads=num_parallel_uploads,
+        )
+
+        return object_path
+
+    async def create_object_from_file(
         self,
         object_path: str,
         file: str,
@@ -39,7 +88,8 @@ class MinioRepository:
         bucket_name: str = base_bucket,
     ) -> str:
         logger.debug("Minio - Repository - create_object_from_file")
-        self._client.fput_object(
+        await self._run(
+            self._client.fput_object,
             bucket_name,
             object_path,
             file,
@@ -48,15 +98,34 @@ class MinioRepository:
 
         return object_path
 
-    def create_bucket(self, name: str):
+    async def create_bucket(self, name: str):
         logger.debug("Minio - Repository - create_bucket")
-        found = self._client.bucket_exists(name)
+        found = await self._run(self._client.bucket_exists, name)
         if not found:
-            self._client.make_bucket(name)
+            await self._run(self._client.make_bucket, name)
+
+    async def get_object(
+        self, object_path: str, bucket_name: str = base_bucket
+    ) -> bytes:
+        logger.debug("Minio - Repository - get_object")
+        return await self._run(self._read_object, object_path, bucket_name)
+
+    def _read_object(self, object_path: str, bucket_name: str) -> bytes:
+        response = self._client.get_object(bucket_name, object_path)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
 
     def get_link(self, object_path: str, bucket_name: str) -> str:
         logger.debug("Minio - Repository - get_link")
 
-        url = self._client.get_presigned_url("GET", bucket_name, object_path)
+        url = self._signer.sign(bucket_name, object_path)
 
         return url
+
+    def get_links(self, object_paths: Sequence[str], bucket_name: str) -> list[str]:
+        logger.debug("Minio - Repository - get_links")
+
+        return self._signer.sign_many(bucket_name, object_paths)
@@ -6,16 +6,19 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from errors.errors import ErrEntityNotFound
+from utils.pagination import Cursor, keyset
 
 
 class CRUDRepositoryMixin:
-    def __init__(self, model: Type[Any], db: AsyncSession):
+    def __init__(self, model: Type[Any], db: AsyncSession, options: Sequence = ()):
         self.model = model
         self._db = db
+        # опции загрузки (например, selectinload связей) для list и get
+        self._options = options
 
     async def list(self, limit: int, offset: int, **filters) -> Sequence[Any]:
         logger.debug(f"{self.model.__name__} - Repository - get_list")
-        query = select(self.model).offset(offset).limit(limit)
+        query = select(self.model).options(*self._options).offset(offset).limit(limit)
 
         for k, v in filters.items():
             try:
@@ -28,16 +31,48 @@ class CRUDRepositoryMixin:
         result = await self._db.execute(query)
         return result.scalars().all()
 
+    async def list_page(
+        self, limit: int, after: Cursor | None = None, offset: int = 0, **filters
+    ) -> Sequence[Any]:
+        logger.debug(f"{self.model.__name__} - Repository - list_page")
+        query = keyset(select(self.model).options(*self._options), self.model, after)
+
+        for k, v in filters.items():
+            try:
+                column = getattr(self.model, k)
+            except AttributeError:
+                continue
+
+            query = query.where(column == v)
+
+        # смещение оставлено для старых клиентов, курсор его заменяет
+        if after is None and offset:
+            query = query.offset(offset)
+
+        result = await self._db.execute(query.limit(limit))
+        return result.scalars().all()
+
     async def get(self, id: uuid.UUID) -> Any:
         logger.debug(f"{self.model.__name__} - Repository - get_by_id")
-        instance = await self._db.get(self.model, id)
+        instance = await self._db.get(self.model, id, options=self._options)
         if instance is None:
             raise ErrEntityNotFound(f"{self.model.__name__} not found")
         return instance
 
-    async def create(self, instance: Any) -> Any:
+    async def create(self, instance: Any, commit: bool = True) -> Any:
         logger.debug(f"{self.model.__name__} - Repository - create")
         self._db.add(instance)
+        if not commit:
+            # запись уйдёт в базу вместе со следующим коммитом сессии
+            await self._db.flush()
+            return instance
+
+        await self._db.commit()
+        await self._db.refresh(instance)
+        return instance
+
+    async def update(self, instance: Any) -> Any:
+        logger.debug(f"{self.model.__name__} - Repository - update")
         await self._db.commit()
         await self._db.refresh(instance)
         return instance
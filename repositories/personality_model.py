@@ -1,9 +1,10 @@
 import uuid
-from typing import Sequence
+from datetime import datetime
+from typing import AsyncIterator, Sequence
 
 from fastapi import Depends
 from loguru import logger
-from sqlalchemy import select
+from sqlalchemy import Row, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from configs.Database import get_db_connection
@@ -21,6 +22,23 @@ class PersonalityModelRepository:
         await self._db.refresh(opts)
         return opts
 
+    async def create_many(
+        self, opts: Sequence[dict], commit: bool = True
+    ) -> Sequence[PersonalityModel]:
+        logger.debug("PersonalityModel - Repository - create_many")
+        if not opts:
+            return []
+
+        # один INSERT ... VALUES (...), (...) RETURNING на все строки
+        result = await self._db.scalars(
+            insert(PersonalityModel).returning(PersonalityModel), list(opts)
+        )
+        personality_models = result.all()
+
+        if commit:
+            await self._db.commit()
+        return personality_models
+
     async def get_by_card_id(self, card_id: uuid.UUID) -> Sequence[PersonalityModel]:
         logger.debug("PersonalityModel - Repository - get_by_card_id")
         query = select(PersonalityModel).where(PersonalityModel.card == card_id)
@@ -36,3 +54,27 @@ class PersonalityModelRepository:
 
         result = await self._db.execute(query)
         return result.scalars().all()
+
+    async def stream_updated_since(
+        self, model: str, since: datetime | None = None, batch_size: int = 10_000
+    ) -> AsyncIterator[Sequence[Row]]:
+        logger.debug("PersonalityModel - Repository - stream_updated_since")
+        # только нужные столбцы, без ORM-объектов: индекс сопоставления может
+        # загружать миллионы строк
+        query = (
+            select(
+                PersonalityModel.card,
+                PersonalityModel.vacancy,
+                PersonalityModel.parameter,
+                PersonalityModel.confidence,
+                PersonalityModel.updated_at,
+            )
+            .where(PersonalityModel.model == model)
+            .order_by(PersonalityModel.updated_at)
+        )
+        if since is not None:
+            query = query.where(PersonalityModel.updated_at > since)
+
+        result = await self._db.stream(query.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield partition
@@ -4,10 +4,12 @@ from fastapi import Depends
 from loguru import logger
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from configs.Database import get_db_connection
 from models.vacancy import Vacancy
 from schemas.vacancy import ListVacancyOpts
+from utils.pagination import Cursor, keyset
 
 
 class VacancyRepository:
@@ -22,8 +24,20 @@ class VacancyRepository:
         await self._db.refresh(opts)
         return opts
 
-    async def list(self, opts: ListVacancyOpts) -> Sequence[Vacancy]:
-        query = select(Vacancy).limit(opts.limit).offset(opts.offset)
+    async def list(
+        self, opts: ListVacancyOpts, after: Cursor | None = None
+    ) -> Sequence[Vacancy]:
+        logger.debug("Vacancy - Repository - list")
+        # модели личности всей страницы подгружаются одним запросом IN (...)
+        query = keyset(
+            select(Vacancy).options(selectinload(Vacancy.personality_models)),
+            Vacancy,
+            after,
+        ).limit(opts.limit)
+
+        # смещение оставлено для старых клиентов, курсор его заменяет
+        if after is None and opts.offset:
+            query = query.offset(opts.offset)
 
         result = await self._db.execute(query)
 
@@ -1,25 +1,111 @@
+import json
 import uuid
 from typing import List
 
-from fastapi import Depends, APIRouter, UploadFile, File, Form, HTTPException
-
-from schemas.card import CardSchema, ListCardOpts
+from fastapi import (
+    Depends,
+    APIRouter,
+    UploadFile,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    Query,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
+
+from schemas.card import AdviceSchema, CardSchema, ListCardOpts
+from schemas.job import JobEventSchema, JobSchema
+from schemas.matching import MatchSchema
 from services.card import CardService
+from services.job import JobService
+from services.matching import MatchingService
+from utils.pagination import NEXT_CURSOR_HEADER, next_cursor
 
 router = APIRouter(prefix="/api/v1/card", tags=["card"])
 
 
 @router.get("/", summary="list of the cards", response_model=List[CardSchema])
 async def get_list(
+    response: Response,
     limit: int = 100,
     offset: int = 0,
+    cursor: str | None = None,
     card_service: CardService = Depends(),
 ):
-    cards = await card_service.list(ListCardOpts(offset=offset, limit=limit))
+    cards = await card_service.list(
+        ListCardOpts(offset=offset, limit=limit, cursor=cursor)
+    )
+
+    cursor = next_cursor(cards, limit)
+    if cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
 
     return cards
 
 
+@router.get(
+    "/job/{id}", summary="getting card processing job by id", response_model=JobSchema
+)
+async def get_job(
+    id: uuid.UUID,
+    job_service: JobService = Depends(),
+):
+    job = await job_service.get(id)
+
+    return job
+
+
+def _format_event(event: JobEventSchema | None) -> str:
+    if event is None:
+        # комментарий SSE не даёт прокси закрыть простаивающее соединение
+        return ": keep-alive\n\n"
+
+    data = json.dumps(event.data, ensure_ascii=False)
+    return f"id: {event.id}\nevent: {event.event}\ndata: {data}\n\n"
+
+
+@router.get(
+    "/job/{id}/events",
+    summary="server-sent events of the card processing job",
+    response_class=StreamingResponse,
+)
+async def get_job_events(
+    id: uuid.UUID,
+    last_event_id: int = Header(0),
+    job_service: JobService = Depends(),
+):
+    # сегменты расшифровки приходят по мере декодирования, затем полная
+    # транскрипция, оценки OCEAN по одной черте и финальный статус задачи;
+    # при переподключении браузер передаёт Last-Event-ID и получает остаток
+    events = await job_service.events(id, last_event_id)
+
+    async def stream():
+        async for event in events:
+            yield _format_event(event)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get(
+    "/{id}/vacancies",
+    summary="best matching vacancies for the card",
+    response_model=List[MatchSchema],
+)
+async def get_vacancies(
+    id: uuid.UUID,
+    k: int = Query(10, ge=1, le=100),
+    matching_service: MatchingService = Depends(),
+):
+    return await matching_service.vacancies_for_card(id, k)
+
+
 @router.get("/{id}", summary="getting card by id", response_model=CardSchema)
 async def get(
     id: uuid.UUID,
@@ -29,16 +115,40 @@ async def get(
 
     return card
 
-@router.get("advice/{id}", summary="getting advice by card id")
-async def get(
-        id: uuid.UUID,
-        card_service: CardService = Depends(),
+
+@router.get(
+    "/{id}/advice", summary="getting advice by card id", response_model=AdviceSchema
+)
+async def get_advice(
+    id: uuid.UUID,
+    card_service: CardService = Depends(),
 ):
-    advice = await card_service.create_advice(id)
+    advice = await card_service.get_advice(id)
 
     return advice
 
-@router.post("/", summary="creating card", response_model=CardSchema)
+
+@router.post(
+    "/{id}/advice",
+    summary="regenerating advice for the card",
+    response_model=JobSchema,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def regenerate_advice(
+    id: uuid.UUID,
+    card_service: CardService = Depends(),
+):
+    job = await card_service.regenerate_advice(id)
+
+    return job
+
+
+@router.post(
+    "/",
+    summary="creating card",
+    response_model=JobSchema,
+    status_code=status.HTTP_202_ACCEPTED,
+)
 async def create(
     pdf_file: UploadFile = File(..., description="Upload a PDF file"),
     video_file: UploadFile = File(..., description="Upload an MP4 video file"),
@@ -56,12 +166,10 @@ async def create(
             status_code=400, detail="Invalid file type for video. Expected video/mp4"
         )
 
-    pdf = await pdf_file.read()
-    video = await video_file.read()
-
-    card = await card_service.create(pdf, video, motivation_letter)
+    # файлы уже лежат в spool-файлах Starlette и передаются в MinIO потоком
+    job = await card_service.create(pdf_file.file, video_file.file, motivation_letter)
 
-    return card
+    return job
 
 
 # @router.delete("/", summary="deleting card")
@@ -1,16 +1,23 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 
-from schemas.auth import (
-    Token,
-)
+from ml.lifespan import registry
+from schemas.metric import StatusSchema
 
 router = APIRouter(prefix="/api/v1/metric", tags=["metric"])
 
 
 @router.get(
     "/status",
-    summary="получение токена",
-    response_model=Token,
+    summary="состояние сервиса и загрузки моделей",
+    response_model=StatusSchema,
 )
 async def status():
-    return "UP"
+    return StatusSchema(status="UP", models=registry.status())
+
+
+@router.get("/ready", summary="готовность всех разрешённых моделей")
+async def ready():
+    if not registry.is_ready():
+        raise HTTPException(status_code=503, detail="models are not loaded yet")
+
+    return "READY"
@@ -1,23 +1,35 @@
+import uuid
 from typing import List
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 
 from models.user import User
+from schemas.matching import MatchSchema
 from schemas.vacancy import VacancySchema, ListVacancyOpts, CreateVacancyOpts
 from services.auth import authenticated
+from services.matching import MatchingService
 from services.vacancy import VacancyService
+from utils.pagination import NEXT_CURSOR_HEADER, next_cursor
 
 router = APIRouter(prefix="/api/v1/vacancy", tags=["vacancy"])
 
 
 @router.get("/", summary="list of the vacancy", response_model=List[VacancySchema])
 async def get_list(
+    response: Response,
     offset: int = 0,
     limit: int = 100,
+    cursor: str | None = None,
     vacancy_service: VacancyService = Depends(),
     _: User = Depends(authenticated),
 ):
-    vacancies = await vacancy_service.list(ListVacancyOpts(offset=offset, limit=limit))
+    vacancies = await vacancy_service.list(
+        ListVacancyOpts(offset=offset, limit=limit, cursor=cursor)
+    )
+
+    cursor = next_cursor(vacancies, limit)
+    if cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
 
     return vacancies
 
@@ -31,3 +43,17 @@ async def create(
     vacancy = await vacancy_service.create(opts)
 
     return vacancy
+
+
+@router.get(
+    "/{id}/cards",
+    summary="best matching cards for the vacancy",
+    response_model=List[MatchSchema],
+)
+async def get_cards(
+    id: uuid.UUID,
+    k: int = Query(10, ge=1, le=100),
+    matching_service: MatchingService = Depends(),
+    _: User = Depends(authenticated),
+):
+    return await matching_service.cards_for_vacancy(id, k)
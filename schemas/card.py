@@ -11,7 +11,7 @@ class CardSchema(BaseModel):
     id: uuid.UUID
     video_link: str
 
-    transcription: str
+    transcription: str | None = None
 
     resume_link: str
 
@@ -19,10 +19,23 @@ class CardSchema(BaseModel):
 
     personality_models: List[PersonalityModelSchema]
 
+    mbti: str | None = None
+    holland_code: str | None = None
+
     created_at: datetime
     updated_at: datetime
 
 
+class AdviceSchema(BaseModel):
+    card: uuid.UUID
+    advice: str
+    model: str
+    prompt: str
+
+    generated_at: datetime
+
+
 class ListCardOpts(BaseModel):
     offset: int = 0
     limit: int = 100
+    cursor: str | None = None
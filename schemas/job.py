@@ -0,0 +1,35 @@
+import uuid
+from datetime import datetime
+from enum import Enum
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class JobStatus(Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class JobKind(Enum):
+    PROCESS = "process"
+    ADVICE = "advice"
+
+
+class JobSchema(BaseModel):
+    id: uuid.UUID
+    card: uuid.UUID
+    kind: JobKind = JobKind.PROCESS
+    status: JobStatus
+    error: str | None = None
+
+    created_at: datetime
+    updated_at: datetime
+
+
+class JobEventSchema(BaseModel):
+    id: int
+    event: str
+    data: Any = None
@@ -0,0 +1,8 @@
+import uuid
+
+from pydantic import BaseModel
+
+
+class MatchSchema(BaseModel):
+    id: uuid.UUID
+    score: float
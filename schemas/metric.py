@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+
+
+class ModelStatusSchema(BaseModel):
+    state: str
+    load_seconds: float | None = None
+    error: str | None = None
+    memory_bytes: dict[str, int] | None = None
+
+
+class StatusSchema(BaseModel):
+    status: str
+    models: dict[str, ModelStatusSchema]
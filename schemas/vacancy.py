@@ -1,4 +1,5 @@
 import uuid
+from datetime import datetime
 from typing import List
 
 from pydantic import BaseModel
@@ -15,10 +16,14 @@ class VacancySchema(BaseModel):
 
     personality_models: List[PersonalityModelSchema]
 
+    created_at: datetime
+    updated_at: datetime
+
 
 class ListVacancyOpts(BaseModel):
     offset: int = 0
     limit: int = 100
+    cursor: str | None = None
 
 
 class CreateVacancyOpts(BaseModel):
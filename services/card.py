@@ -1,18 +1,32 @@
-import io
 import uuid
+from datetime import datetime
+from typing import BinaryIO, Sequence
 
+import numpy as np
 from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
 from loguru import logger
 
-from errors.errors import ErrBadRequest
+from configs.Environment import EnvironmentSettings, get_environment_variables
+
+from errors.errors import ErrBadRequest, ErrEntityNotFound
 from models.card import Card
 from repositories.card import CardRepository
-from schemas.card import CardSchema, ListCardOpts
+from schemas.card import AdviceSchema, CardSchema, ListCardOpts
+from schemas.job import JobKind, JobSchema
 from schemas.personality_models import CreatePersonalityModel
-from services.ml import MlService
+from services.job import JobService
+from ml.constants import RUGPT
+from ml.executor import MlExecutor
+from services.ml import get_ml_executor
 from services.minio import MinioService
 from services.personality_model import PersonalityModelService
-from utils.convertors import PersonalityConverter
+from utils.convertors import (
+    TRAITS,
+    get_personality_converter,
+    update_personality_statistics,
+)
+from utils.pagination import decode_cursor
 
 
 class CardService:
@@ -21,69 +35,180 @@ class CardService:
         repo: CardRepository = Depends(),
         minio: MinioService = Depends(),
         personality_model_service: PersonalityModelService = Depends(),
-        ml_service: MlService = Depends(),
+        ml_executor: MlExecutor = Depends(get_ml_executor),
+        job_service: JobService = Depends(),
+        config: EnvironmentSettings = Depends(get_environment_variables),
     ):
         self._repo = repo
         self._minio = minio
         self._personality_model_service = personality_model_service
-        self._ml = ml_service
+        self._ml = ml_executor
+        self._job_service = job_service
+        self._update_statistics = config.PERSONALITY_STATISTICS_UPDATE
+        self._statistics_path = config.PERSONALITY_STATISTICS_PATH
 
     async def create(
-        self, resume: bytes, card: bytes, motivation_letter: str
-    ) -> CardSchema:
+        self, resume: BinaryIO, card: BinaryIO, motivation_letter: str
+    ) -> JobSchema:
         logger.debug("Card - Service - create")
         id = uuid.uuid4()
 
-        transcribe = self._ml.transcript_video(card)
-
-        ocean = self._ml.get_ocean(card, transcribe)
-
-        resume_path = self._minio.upload_resume(id, resume)
+        resume_path = await self._minio.upload_resume(id, resume)
 
-        video_path = self._minio.upload_video_card(id, io.BytesIO(card))
+        video_path = await self._minio.upload_video_card(id, card)
 
-        card = await self._repo.create(
+        # карточка и её задача коммитятся одной транзакцией: репозитории
+        # карточки и задач работают в одной сессии
+        await self._repo.create(
             Card(
                 id=id,
                 video_path=video_path,
-                transcription=transcribe,
                 resume_path=resume_path,
                 motivation_letter=motivation_letter,
-            )
+            ),
+            commit=False,
         )
 
-        for letter, score in ocean.items():
-            await self._personality_model_service.create(CreatePersonalityModel(model="OCEAN", parameter=letter, confidence=score, card=id))
+        return await self._job_service.enqueue(id)
+
+    async def process(self, id: uuid.UUID, job_id: uuid.UUID | None = None) -> None:
+        logger.debug("Card - Service - process")
+        card = await self._repo.get(id)
+
+        video = await self._minio.download(card.video_path)
+
+        # модели тяжёлые и синхронные, поэтому выполняются в пуле процессов;
+        # промежуточные результаты сразу уходят подписчикам событий задачи
+        transcribe, ocean = "", {}
+        async for event, data in self._ml.stream("analyze_video_stream", video):
+            if event == "transcript":
+                transcribe = data
+            elif event == "ocean":
+                ocean[data["trait"]] = data["score"]
+
+            if job_id is not None:
+                await self._job_service.publish(job_id, event, data)
+
+        # транскрипция и все строки OCEAN фиксируются одной транзакцией:
+        # репозитории карточки и моделей личности работают в одной сессии
+        card.transcription = transcribe
+        await self._personality_model_service.create_many(
+            [
+                CreatePersonalityModel(
+                    model="OCEAN", parameter=letter, confidence=score, card=id
+                )
+                for letter, score in ocean.items()
+            ],
+            commit=False,
+        )
+        await self._repo.update(card)
 
-        return await self._card_repo_to_schema(card)
+        if self._update_statistics:
+            # карточка уже сохранена: ошибка статистики не должна проваливать задачу
+            try:
+                await run_in_threadpool(
+                    update_personality_statistics, [ocean], self._statistics_path
+                )
+            except Exception:
+                logger.exception("Card - Service - statistics update failed")
 
     async def get(self, id: uuid.UUID) -> CardSchema:
         logger.debug("Card - Service - get")
         card = await self._repo.get(id)
 
-        return await self._card_repo_to_schema(card)
+        return self._cards_repo_to_schema([card])[0]
 
     async def list(self, opts: ListCardOpts) -> list[CardSchema]:
         logger.debug("Card - Service - list")
-        cards = await self._repo.list(opts.limit, opts.offset)
-
-        return [await self._card_repo_to_schema(card) for card in cards]
-
-    async def _card_repo_to_schema(self, req: Card) -> CardSchema:
-        return CardSchema(
-            id=req.id,
-            video_link=self._minio.get_link(req.video_path),
-            transcription=req.transcription,
-            resume_link=self._minio.get_link(req.resume_path),
-            motivation_letter=req.motivation_letter,
-            personality_models=await self._personality_model_service.get_by_card_id(
-                req.id
-            ),
-            created_at=req.created_at,
-            updated_at=req.updated_at,
+        after = decode_cursor(opts.cursor) if opts.cursor else None
+        cards = await self._repo.list_page(opts.limit, after, opts.offset)
+
+        return self._cards_repo_to_schema(cards)
+
+    def _cards_repo_to_schema(self, reqs: Sequence[Card]) -> list[CardSchema]:
+        # ссылки всей страницы подписываются одним пакетом
+        links = self._minio.get_links(
+            [path for req in reqs for path in (req.video_path, req.resume_path)]
         )
+        types = self._personality_types(reqs)
+
+        return [
+            CardSchema(
+                id=req.id,
+                video_link=links[2 * i],
+                transcription=req.transcription,
+                resume_link=links[2 * i + 1],
+                motivation_letter=req.motivation_letter,
+                personality_models=self._personality_model_service.to_schemas(
+                    req.personality_models
+                ),
+                mbti=types.get(req.id, (None, None))[0],
+                holland_code=types.get(req.id, (None, None))[1],
+                created_at=req.created_at,
+                updated_at=req.updated_at,
+            )
+            for i, req in enumerate(reqs)
+        ]
+
+    def _personality_types(
+        self, reqs: Sequence[Card]
+    ) -> dict[uuid.UUID, tuple[str, str]]:
+        converter = get_personality_converter(self._statistics_path)
+        if converter is None:
+            return {}
+
+        # типы считаются только для карточек, у которых оценены все черты;
+        # вся страница пересчитывается одним матричным произведением
+        ids, rows = [], []
+        for req in reqs:
+            scores = {
+                pm.parameter: pm.confidence
+                for pm in req.personality_models
+                if pm.model == "OCEAN"
+            }
+            if all(trait in scores for trait in TRAITS):
+                ids.append(req.id)
+                rows.append([scores[trait] for trait in TRAITS])
+
+        if not rows:
+            return {}
+
+        mbti_types, _, holland_codes, _ = converter.calculate_batch(np.array(rows))
+
+        return dict(zip(ids, zip(mbti_types, holland_codes)))
+
+    async def create_advice(self, id: uuid.UUID) -> AdviceSchema:
+        logger.debug("Card - Service - create_advice")
+        traits = await self._advice_traits(id)
+
+        advice, prompt = await self._ml.run("generate_advice", traits)
+
+        card = await self._repo.get(id)
+        card.advice = advice
+        card.advice_prompt = prompt
+        card.advice_model = RUGPT
+        card.advice_generated_at = datetime.now()
+        await self._repo.update(card)
+
+        return self._advice_repo_to_schema(card)
+
+    async def get_advice(self, id: uuid.UUID) -> AdviceSchema:
+        logger.debug("Card - Service - get_advice")
+        card = await self._repo.get(id)
 
-    async def create_advice(self, id: uuid.UUID) -> str:
+        if card.advice is None:
+            raise ErrEntityNotFound("advice is not generated yet")
+
+        return self._advice_repo_to_schema(card)
+
+    async def regenerate_advice(self, id: uuid.UUID) -> JobSchema:
+        logger.debug("Card - Service - regenerate_advice")
+        # параметры проверяются до постановки задачи, чтобы ошибка пришла сразу
+        await self._advice_traits(id)
+
+        return await self._job_service.enqueue(id, JobKind.ADVICE)
+
+    async def _advice_traits(self, id: uuid.UUID) -> dict[str, float]:
         personality_models = await self._personality_model_service.get_by_card_id(id)
 
         if len(personality_models) < 6:
@@ -94,6 +219,13 @@ class CardService:
         for personality_model in personality_models:
             dct[personality_model.parameter] = personality_model.confidence
 
-        advice = self._ml.generate_advice(dct)
+        return dct
 
-        return advice
\ No newline at end of file
+    def _advice_repo_to_schema(self, req: Card) -> AdviceSchema:
+        return AdviceSchema(
+            card=req.id,
+            advice=req.advice,
+            model=req.advice_model,
+            prompt=req.advice_prompt,
+            generated_at=req.advice_generated_at,
+        )
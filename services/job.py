@@ -0,0 +1,147 @@
+import json
+import uuid
+from typing import Any, AsyncIterator
+
+from fastapi import Depends
+from loguru import logger
+
+from configs.Broker import get_broker
+from models.job import Job
+from repositories.job import JobRepository
+from schemas.job import JobEventSchema, JobKind, JobSchema, JobStatus
+from workers.broker import Broker
+
+# сколько секунд поток событий ждёт новое событие, прежде чем перечитать
+# статус задачи и отправить клиенту keep-alive
+EVENT_POLL_TIMEOUT = 15.0
+
+FINAL_STATUSES = (JobStatus.DONE, JobStatus.FAILED)
+
+
+def _channel(id: uuid.UUID) -> str:
+    return f"job:{id}"
+
+
+class JobService:
+    def __init__(
+        self,
+        repo: JobRepository = Depends(),
+        broker: Broker = Depends(get_broker),
+    ):
+        self._repo = repo
+        self._broker = broker
+
+    async def enqueue(
+        self, card_id: uuid.UUID, kind: JobKind = JobKind.PROCESS
+    ) -> JobSchema:
+        logger.debug("Job - Service - enqueue")
+        # коммит задачи фиксирует и всё, что вызывающий добавил в ту же сессию
+        job = await self._repo.create(
+            Job(card=card_id, kind=kind.value, status=JobStatus.PENDING.value)
+        )
+
+        try:
+            await self._broker.enqueue(str(job.id))
+        except Exception as e:
+            # задача, которой нет в очереди, иначе навсегда осталась бы в pending
+            logger.exception(f"cannot enqueue job {job.id}")
+            await self._repo.update_status(job.id, JobStatus.FAILED.value, str(e))
+            raise
+
+        return self._job_repo_to_schema(job)
+
+    async def get(self, id: uuid.UUID) -> JobSchema:
+        logger.debug("Job - Service - get")
+        job = await self._repo.get(id)
+
+        return self._job_repo_to_schema(job)
+
+    async def set_status(
+        self, id: uuid.UUID, status: JobStatus, error: str | None = None
+    ) -> JobSchema:
+        logger.debug("Job - Service - set_status")
+        job = await self._repo.update_status(id, status.value, error)
+
+        await self.publish(id, "status", {"status": status.value, "error": error})
+
+        return self._job_repo_to_schema(job)
+
+    async def publish(self, id: uuid.UUID, event: str, data: Any = None) -> None:
+        await self._broker.publish(
+            _channel(id), json.dumps({"event": event, "data": data})
+        )
+
+    async def events(
+        self, id: uuid.UUID, after: int = 0
+    ) -> AsyncIterator[JobEventSchema | None]:
+        """
+        Возвращает поток событий задачи, начиная с события после `after`.
+
+        Задача проверяется сразу, чтобы отсутствующая задача дала 404 до начала
+        потока. Поток завершается событием финального статуса; None означает,
+        что событий давно не было и клиенту пора отправить keep-alive.
+        """
+        logger.debug("Job - Service - events")
+        await self._repo.get_status(id)
+
+        return self._events(id, after)
+
+    async def _events(
+        self, id: uuid.UUID, after: int
+    ) -> AsyncIterator[JobEventSchema | None]:
+        while True:
+            events = await self._broker.read(_channel(id), after, EVENT_POLL_TIMEOUT)
+            if events:
+                for event in self._parse(events):
+                    yield event
+                    after = event.id
+                    if self._is_final(event):
+                        return
+                continue
+
+            # задача могла завершиться раньше, чем её события попали в
+            # канал (или после их удаления) — итог берётся из базы
+            job = self._job_repo_to_schema(await self._repo.get_status(id))
+            if job.status not in FINAL_STATUSES:
+                yield None
+                continue
+
+            # события, опубликованные между пустым чтением и запросом к базе,
+            # уже лежат в канале и отдаются перед итоговым статусом
+            for event in self._parse(await self._broker.read(_channel(id), after, 0)):
+                yield event
+                after = event.id
+                if self._is_final(event):
+                    return
+
+            yield JobEventSchema(
+                id=after,
+                event="status",
+                data={"status": job.status.value, "error": job.error},
+            )
+            return
+
+    @staticmethod
+    def _parse(events: list[tuple[int, str]]) -> list[JobEventSchema]:
+        return [
+            JobEventSchema(id=event_id, **json.loads(payload))
+            for event_id, payload in events
+        ]
+
+    @staticmethod
+    def _is_final(event: JobEventSchema) -> bool:
+        return (
+            event.event == "status"
+            and JobStatus(event.data["status"]) in FINAL_STATUSES
+        )
+
+    def _job_repo_to_schema(self, req: Job) -> JobSchema:
+        return JobSchema(
+            id=req.id,
+            card=req.card,
+            kind=JobKind(req.kind),
+            status=JobStatus(req.status),
+            error=req.error,
+            created_at=req.created_at,
+            updated_at=req.updated_at,
+        )
@@ -0,0 +1,83 @@
+import asyncio
+import time
+import uuid
+from datetime import timedelta
+from typing import List
+
+from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
+from loguru import logger
+
+from configs.Environment import EnvironmentSettings, get_environment_variables
+from configs.Matching import get_matcher
+from errors.errors import ErrEntityNotFound
+from ml.matching import OceanMatcher, VectorIndex
+from repositories.personality_model import PersonalityModelRepository
+from schemas.matching import MatchSchema
+
+# updated_at проставляется при вставке, а коммит может прийти позже, поэтому
+# синхронизация перечитывает строки с небольшим запасом до последней отметки
+SYNC_OVERLAP = timedelta(seconds=60)
+
+_sync_lock = asyncio.Lock()
+
+
+class MatchingService:
+    def __init__(
+        self,
+        repo: PersonalityModelRepository = Depends(),
+        matcher: OceanMatcher = Depends(get_matcher),
+        config: EnvironmentSettings = Depends(get_environment_variables),
+    ):
+        self._repo = repo
+        self._matcher = matcher
+        self._sync_interval = config.MATCHING_SYNC_INTERVAL_S
+        self._metric = config.MATCHING_METRIC
+
+    async def sync(self, force: bool = False) -> None:
+        # карточки оцениваются в отдельном процессе воркера, поэтому индекс
+        # догоняет базу по updated_at, а не по событиям своего процесса
+        if not force and self._is_fresh():
+            return
+
+        async with _sync_lock:
+            if not force and self._is_fresh():
+                return
+
+            logger.debug("Matching - Service - sync")
+            watermark = self._matcher.watermark
+            since = watermark - SYNC_OVERLAP if watermark is not None else None
+
+            async for rows in self._repo.stream_updated_since("OCEAN", since):
+                self._matcher.apply(rows)
+
+            self._matcher.synced_at = time.monotonic()
+
+    def _is_fresh(self) -> bool:
+        return time.monotonic() - self._matcher.synced_at < self._sync_interval
+
+    async def cards_for_vacancy(self, id: uuid.UUID, k: int) -> List[MatchSchema]:
+        logger.debug("Matching - Service - cards_for_vacancy")
+        await self.sync()
+
+        return await self._search(self._matcher.vacancies, self._matcher.cards, id, k)
+
+    async def vacancies_for_card(self, id: uuid.UUID, k: int) -> List[MatchSchema]:
+        logger.debug("Matching - Service - vacancies_for_card")
+        await self.sync()
+
+        return await self._search(self._matcher.cards, self._matcher.vacancies, id, k)
+
+    async def _search(
+        self, source: VectorIndex, target: VectorIndex, id: uuid.UUID, k: int
+    ) -> List[MatchSchema]:
+        profile = source.get(id)
+        if profile is None:
+            raise ErrEntityNotFound("personality profile not found")
+
+        vector, mask = profile
+        matches = await run_in_threadpool(
+            target.search, vector, mask, k, self._metric
+        )
+
+        return [MatchSchema(id=match_id, score=score) for match_id, score in matches]
@@ -1,34 +1,75 @@
-import io
 import uuid
+from typing import BinaryIO, Sequence
 
 from fastapi import Depends
 from loguru import logger
 
+from configs.Environment import EnvironmentSettings, get_environment_variables
 from configs.Minio import base_bucket
 from repositories.minio import MinioRepository
 from schemas.minio import MinioContentType
 
 
+# минимальный размер части multipart upload в S3
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
 class MinioService:
-    def __init__(self, repo: MinioRepository = Depends()):
+    def __init__(
+        self,
+        repo: MinioRepository = Depends(),
+        config: EnvironmentSettings = Depends(get_environment_variables),
+    ):
         self._repo = repo
 
-    def upload_resume(self, id: uuid.UUID, pdf: bytes) -> str:
+        # на запрос в памяти одновременно находятся загружаемые части и одна читаемая
+        self._part_size = max(MIN_PART_SIZE, config.MINIO_PART_SIZE_MB * 1024 * 1024)
+        self._num_parallel_uploads = max(
+            1, config.UPLOAD_MEMORY_LIMIT_MB * 1024 * 1024 // self._part_size - 1
+        )
+
+    async def upload_resume(self, id: uuid.UUID, pdf: BinaryIO) -> str:
         logger.debug("Minio - Service - upload_resume")
-        return self._repo.create_object_from_byte(
-            f"resume/{id}/{uuid.uuid4()}.pdf",
-            io.BytesIO(pdf),
-            MinioContentType.PDF,
+        return await self._upload_stream(
+            f"resume/{id}/{uuid.uuid4()}.pdf", pdf, MinioContentType.PDF
         )
 
-    def upload_video_card(self, id: uuid.UUID, video: io.BytesIO) -> str:
+    async def upload_video_card(self, id: uuid.UUID, video: BinaryIO) -> str:
         logger.debug("Minio - Service - upload_video_card")
-        return self._repo.create_object_from_byte(
+        return await self._upload_stream(
             f"card/{id}/{uuid.uuid4()}.mp4", video, MinioContentType.MP4
         )
 
+    async def _upload_stream(
+        self, object_path: str, stream: BinaryIO, content_type: MinioContentType
+    ) -> str:
+        stream.seek(0)
+        return await self._repo.create_object_from_stream(
+            object_path,
+            stream,
+            content_type,
+            self._part_size,
+            self._num_parallel_uploads,
+        )
+
+    async def download(
+        self, object_path: str, bucket_name: str = base_bucket
+    ) -> bytes:
+        logger.debug("Minio - Service - download")
+        return await self._repo.get_object(object_path, bucket_name)
+
+    async def create_base_bucket(self) -> None:
+        logger.debug("Minio - Service - create_base_bucket")
+        await self._repo.create_bucket(base_bucket)
+
     def get_link(self, object_path: str, bucket_name: str = base_bucket) -> str:
         logger.debug("Minio - Service - get_link")
         url = self._repo.get_link(object_path, bucket_name)
 
         return url
+
+    def get_links(
+        self, object_paths: Sequence[str], bucket_name: str = base_bucket
+    ) -> list[str]:
+        logger.debug("Minio - Service - get_links")
+        return self._repo.get_links(object_paths, bucket_name)
@@ -1,40 +1,157 @@
-import subprocess
-import tempfile
-
-import librosa
-import pandas as pd
-import torch
-from catboost import Pool
-from imagebind.model import ModalityType
-from imagebind.utils import data
+import threading
+from typing import Any, Iterator
+
+import numpy as np
 from loguru import logger
 
-from ml.lifespan import whisper_model, device, imagebind_model, catboost_models, bert_tokenizer, bert_model
-from ml.constants import LABEL_NAMES, EMBEDDING_FEATURES
+from configs.Environment import get_environment_variables
+from ml.audio import AudioBuffer, load_and_transform_audio_waveform
+from ml.cache import content_digest, get_embedding_cache
+from ml.lifespan import registry, device, imagebind_batchers, advice_generator
+from ml.constants import (
+    ADVICE_PROMPT_PREFIX,
+    AUDIO_MODALITY,
+    EMBEDDING_FEATURES,
+    LABEL_NAMES,
+    TEXT_MODALITY,
+    VISION_MODALITY,
+)
+from ml.executor import MlExecutor
+from ml.scoring import OceanScorer
+from ml.transcription import WhisperTranscriber, join_segments
+from ml.video import decode_frames, frames_to_tensor
+
+env = get_environment_variables()
+
+_whisper_lock = threading.Lock()
+
+# транскрипции зависят от способа расшифровки: версия меняется вместе с
+# `WhisperTranscriber`, режим VAD — настройкой `WHISPER_VAD`
+TRANSCRIPT_NAMESPACE = f"transcript-{'vad' if env.WHISPER_VAD else 'full'}-v2"
 
 
 class MlService:
     def __init__(self):
-        self._whisper_model = whisper_model
-        self._imagebind_model = imagebind_model
+        self._registry = registry
+        self._imagebind_batchers = imagebind_batchers
+        self._advice_generator = advice_generator
+        self._cache = get_embedding_cache()
 
-        self._catboost_models = catboost_models
-        self._label_names = LABEL_NAMES
-        self._embedding_features = EMBEDDING_FEATURES
+        self.device = device
 
-        self._bert_tokenizer = bert_tokenizer
-        self._bert_model = bert_model
+    # модели берутся из реестра при первом обращении, а не при создании сервиса:
+    # сервис создаётся на каждый запрос, в том числе там, где модели не нужны
 
-        self.device = device
+    @property
+    def _whisper_model(self):
+        return self._registry.get("whisper")
+
+    @property
+    def _transcriber(self) -> WhisperTranscriber:
+        return WhisperTranscriber(
+            self._whisper_model, env.WHISPER_BATCH_SIZE, env.WHISPER_VAD
+        )
+
+    @property
+    def _scorer(self) -> OceanScorer:
+        return OceanScorer(
+            self._registry.get("catboost"), LABEL_NAMES, EMBEDDING_FEATURES
+        )
+
+    def prepare_audio(self, video: bytes) -> AudioBuffer:
+        """
+        Готовит аудиодорожку видео для всех последующих этапов.
+
+        Параметры
+        ----------
+        video : bytes
+            Видео в формате байтов.
+
+        Возвращает
+        -------
+        AudioBuffer
+            Буфер, который принимают `transcript_video` и `get_ocean`. Видео
+            декодируется в моно-сигнал 16 кГц один раз и только если результата
+            нет в кэше.
+        """
+        logger.debug("ML - Service - prepare_audio")
+        return AudioBuffer(video)
+
+    def analyze_video(self, video: bytes) -> tuple[str, dict[str, float]]:
+        """
+        Выполняет все этапы обработки видео: декодирование, транскрипцию и оценку OCEAN.
+
+        Параметры
+        ----------
+        video : bytes
+            Видео в формате байтов.
+
+        Возвращает
+        -------
+        tuple[str, dict[str, float]]
+            Транскрипция и предсказанные значения OCEAN.
 
-    def transcript_video(self, video: bytes) -> str:
+        Примечания
+        ---------
+        Метод предназначен для `MlExecutor`: между процессами передаются только
+        байты видео и небольшой результат, а декодированный сигнал остаётся
+        в процессе пула.
         """
-        Расшифровывает видео и возвращает текстовую транскрипцию.
+        logger.debug("ML - Service - analyze_video")
+
+        audio = self.prepare_audio(video)
+
+        transcribe = self.transcript_video(audio)
+
+        return transcribe, self.get_ocean(audio, transcribe)
+
+    def analyze_video_stream(self, video: bytes) -> Iterator[tuple[str, Any]]:
+        """
+        Потоковый вариант `analyze_video`: выдаёт промежуточные результаты по мере готовности.
 
         Параметры
         ----------
         video : bytes
-            Видео в формате байтов, представляющее содержимое видеофайла для расшифровки.
+            Видео в формате байтов.
+
+        Возвращает
+        -------
+        Iterator[tuple[str, Any]]
+            Пары (событие, данные):
+
+            - ("segment", {"start", "end", "text"}) — сегмент расшифровки;
+            - ("transcript", str) — полная транскрипция после всех сегментов;
+            - ("ocean", {"trait", "score"}) — оценка одной черты.
+
+        Примечания
+        ---------
+        Метод предназначен для `MlExecutor.stream`: события передаются из
+        процесса пула по одному, и клиент видит первый сегмент задолго до
+        окончания обработки.
+        """
+        logger.debug("ML - Service - analyze_video_stream")
+
+        audio = self.prepare_audio(video)
+
+        segments = []
+        for segment in self.iter_transcript(audio):
+            segments.append(segment)
+            yield "segment", segment
+
+        transcribe = join_segments(segments)
+        yield "transcript", transcribe
+
+        for trait, score in self.iter_ocean(audio, transcribe):
+            yield "ocean", {"trait": trait, "score": score}
+
+    def transcript_video(self, audio: AudioBuffer) -> str:
+        """
+        Расшифровывает аудиодорожку видео и возвращает текстовую транскрипцию.
+
+        Параметры
+        ----------
+        audio : AudioBuffer
+            Аудиодорожка, полученная из `prepare_audio`.
 
         Возвращает
         -------
@@ -43,30 +160,49 @@ class MlService:
 
         Примечания
         ---------
-        - Функция сохраняет видео во временный файл формата MP4 для передачи его
-          в модель распознавания речи.
-        - Используется предварительно обученная модель для транскрипции.
-        - После обработки временный файл сохраняется, но может быть удалён после использования.
+        - Whisper получает уже декодированный сигнал и не запускает собственный ffmpeg.
+        - Тишина отбрасывается энергетическим VAD, окна с речью декодируются
+          пакетами по `WHISPER_BATCH_SIZE` (см. `WhisperTranscriber`).
+        - Транскрипция кэшируется по хэшу видео, повторная загрузка того же видео
+          не запускает модель.
         """
         logger.debug("ML - Service - transcribe")
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as temp_audio:
-            temp_audio.write(video)
-            temp_audio_path = temp_audio.name
-            result = self._whisper_model.transcribe(temp_audio_path)
+        return join_segments(list(self.iter_transcript(audio)))
 
-            transcribe = result["text"]
+    def iter_transcript(self, audio: AudioBuffer) -> Iterator[dict[str, Any]]:
+        """
+        Выдаёт сегменты расшифровки ({"start", "end", "text"}) по мере декодирования.
 
-        return transcribe
+        Транскрипция попадает в кэш, только когда выданы все сегменты. Для
+        видео из кэша выдаётся один сегмент с полным текстом и без конца
+        ("end" = None): ради длительности пришлось бы декодировать аудио.
+        """
+        transcribe = self._cache.get_text(TRANSCRIPT_NAMESPACE, audio.digest)
+        if transcribe is not None:
+            yield {"start": 0.0, "end": None, "text": transcribe}
+            return
+
+        segments = []
+        # Whisper вешает хуки kv-кэша на сам модуль модели, поэтому параллельные
+        # расшифровки в потоках одного процесса должны идти по очереди
+        with _whisper_lock:
+            for segment in self._transcriber.iter_segments(audio.waveform):
+                segments.append(segment)
+                yield segment
+
+        self._cache.put_text(
+            TRANSCRIPT_NAMESPACE, audio.digest, join_segments(segments)
+        )
 
-    def get_ocean(self, video: bytes, transcript: str) -> dict[str, float]:
+    def get_ocean(self, audio: AudioBuffer, transcript: str) -> dict[str, float]:
         """
         Извлекает аудио- и текстовые признаки из входных данных и предсказывает значения OCEAN (черты личности) с помощью предобученных моделей CatBoost.
 
         Параметры
         ----------
-        video : bytes
-            Видео файл в байтовом формате, из которого будет извлечена аудиодорожка для последующего анализа.
+        audio : AudioBuffer
+            Аудиодорожка, полученная из `prepare_audio`.
         transcript : str
             Строка с текстовой расшифровкой речи из видео для извлечения текстовых признаков.
 
@@ -77,109 +213,144 @@ class MlService:
 
         Примечания
         ---------
-        1. Метод использует временный файл для хранения аудиоданных, которые затем обрабатываются с целью извлечения признаков.
-        2. Для каждого признака (аудио и текстового) создается объединенный словарь, который используется в качестве входных данных для моделей CatBoost.
-        3. Прогнозы делаются по каждому имени метки из списка `_label_names`, и результаты сохраняются в словаре `answer`.
+        1. Аудиопризнаки считаются по тому же буферу, что и транскрипция, без повторного декодирования.
+        2. Эмбеддинг кадров видео считается, только если его ожидают модели
+           (`video_embedding` в `EMBEDDING_FEATURES`).
+        3. Эмбеддинги передаются в `OceanScorer` как пакет из одной карточки.
 
         Примеры
         --------
-        >>> video_bytes = b'...\x00\x01\x02...'  # Пример байтового содержимого видео
+        >>> audio = instance.prepare_audio(video_bytes)
         >>> transcript_text = "Текстовая расшифровка"
-        >>> result = instance.get_ocean(video_bytes, transcript_text)
+        >>> result = instance.get_ocean(audio, transcript_text)
         >>> print(result)
         {'Openness': 0.75, 'Conscientiousness': 0.82, 'Extraversion': 0.65, 'Agreeableness': 0.78, 'Neuroticism': 0.54}
         """
         logger.debug("ML - Service - get_ocean")
-        answer = {}
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as temp_audio:
-            temp_audio.write(video)
+        return dict(self.iter_ocean(audio, transcript))
 
-            audio, sr, audio_embeddings = self._extract_audio_embedding(temp_audio.name)
+    def iter_ocean(
+        self, audio: AudioBuffer, transcript: str
+    ) -> Iterator[tuple[str, float]]:
+        """Выдаёт пары (черта, оценка) по одной, как только модель черты сделала предсказание."""
+        audio_embeddings = self._extract_audio_embedding(audio)
 
         text_embedding = self._extract_text_embedding(transcript)
 
-        x = pd.DataFrame({
-            "audio_embedding": [audio_embeddings.squeeze().cpu().tolist()],
-            "text_embedding": [text_embedding.squeeze().cpu().tolist()]
-        })
+        embeddings = {
+            "audio_embedding": audio_embeddings.reshape(1, -1),
+            "text_embedding": text_embedding.reshape(1, -1),
+        }
+        if "video_embedding" in EMBEDDING_FEATURES:
+            embeddings["video_embedding"] = self._extract_video_embedding(
+                audio
+            ).reshape(1, -1)
 
-        for label_name in self._label_names:
-            model = self._catboost_models[label_name]
+        for trait, scores in self._scorer.iter_scores(embeddings):
+            yield trait, float(scores[0])
 
-            sample_pool = Pool(data=x, embedding_features=self._embedding_features)
+    def score_batch(self, embeddings: dict[str, np.ndarray]) -> list[dict[str, float]]:
+        """
+        Предсказывает значения OCEAN сразу для набора карточек.
 
-            y_pred = model.predict(sample_pool)[0]
+        Параметры
+        ----------
+        embeddings : dict[str, numpy.ndarray]
+            Эмбеддинги по именам из `EMBEDDING_FEATURES`, каждый формы (N, 1024).
 
-            answer[label_name] = y_pred
+        Возвращает
+        -------
+        list[dict[str, float]]
+            Для каждой из N карточек словарь {черта личности: предсказание}.
 
-        return answer
+        Примечания
+        ---------
+        Все N×6 предсказаний делаются по одному `catboost.Pool`, поэтому метод
+        подходит для пересчёта всей таблицы карточек после обновления моделей.
+        """
+        logger.debug("ML - Service - score_batch")
+
+        scorer = self._scorer
 
-    def _extract_audio_embedding(self, video_path):
+        return scorer.to_dicts(scorer.score_batch(embeddings))
+
+    def _extract_audio_embedding(self, audio: AudioBuffer) -> np.ndarray:
         """
-        Извлекает аудиовектор из видео.
+        Извлекает аудиовектор из декодированного сигнала.
 
         Параметры
         ----------
-        video_path : str
-            Путь к видеофайлу, из которого необходимо извлечь аудиодорожку.
+        audio : AudioBuffer
+            Аудиодорожка, полученная из `prepare_audio`.
 
         Возвращаемое значение
         ----------------------
-        tuple
-            Кортеж, содержащий:
-            - audio : numpy.ndarray
-                Массив, представляющий аудиоданные, загруженные из временного файла.
-            - sr : int
-                Частота дискретизации аудиоданных.
-            - audio_embeddings : torch.Tensor
-                Векторное представление аудиоданных, извлеченное моделью ImageBind.
+        numpy.ndarray
+            Векторное представление аудиоданных, извлеченное моделью ImageBind.
 
         Описание
         ---------
-        Данная функция использует библиотеку ffmpeg для извлечения аудиодорожки из
-        видеофайла и сохранения её во временном WAV-файле. Затем с помощью библиотеки
-        librosa аудиоданные загружаются и преобразуются в массив. После этого аудиоданные
-        обрабатываются моделью ImageBind, чтобы получить векторное представление аудио.
-        Функция возвращает массив аудиоданных, частоту дискретизации и среднее значение
-        векторных представлений аудио.
+        Сигнал преобразуется в мел-спектрограммы клипов так же, как это делает
+        `load_and_transform_audio_data` из ImageBind, но без записи и чтения WAV-файла.
+        Прямой проход выполняется через микробатчер, который объединяет запросы
+        параллельных обработчиков карточек в один пакет. Результат кэшируется
+        по хэшу видео.
+        """
+        audio_embedding = self._cache.get("audio", audio.digest)
+        if audio_embedding is not None:
+            return audio_embedding
 
-        Исключения
+        inputs = load_and_transform_audio_waveform(audio.waveform, self.device)
+
+        audio_embedding = self._imagebind_batchers[AUDIO_MODALITY](inputs).cpu().numpy()
+        self._cache.put("audio", audio.digest, audio_embedding)
+
+        return audio_embedding
+
+    def _extract_video_embedding(self, audio: AudioBuffer) -> np.ndarray:
+        """
+        Извлекает визуальный вектор по кадрам видео.
+
+        Параметры
         ----------
-        - subprocess.CalledProcessError
-            Генерируется, если выполнение команды ffmpeg завершилось с ошибкой.
-        - FileNotFoundError
-            Генерируется, если ffmpeg или необходимые библиотеки не установлены.
+        audio : AudioBuffer
+            Буфер из `prepare_audio`; кадры выбираются из того же видео.
+
+        Возвращаемое значение
+        ----------------------
+        numpy.ndarray
+            Среднее эмбеддингов ImageBind по выбранным кадрам.
+
+        Описание
+        ---------
+        Кадры выбираются с частотой `VIDEO_FPS` (или только ключевые при
+        `VIDEO_KEYFRAMES`), не более `VIDEO_MAX_FRAMES` на видео, и проходят
+        модель одним пакетом через микробатчер. Результат кэшируется по хэшу видео.
         """
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=True) as temp_audio_file:
-            temp_audio_path = temp_audio_file.name
-            subprocess.run(
-                [
-                    "ffmpeg",
-                    "-y",
-                    "-i",
-                    video_path,
-                    temp_audio_path,
-                    "-loglevel",
-                    "error",
-                ],
-                check=True,
-            )
-            audio, sr = librosa.load(temp_audio_path, sr=None)
-
-            inputs = {
-                ModalityType.AUDIO: data.load_and_transform_audio_data(
-                    [temp_audio_path], self.device
-                )
-            }
-            with torch.inference_mode():
-                audio_embeddings = self._imagebind_model(inputs)[
-                    ModalityType.AUDIO
-                ].mean(dim=0)
-
-            return audio, sr, audio_embeddings
-
-    def _extract_text_embedding(self, text) -> torch.Tensor:
+        video_embedding = self._cache.get("video", audio.digest)
+        if video_embedding is not None:
+            return video_embedding
+
+        frames = decode_frames(
+            audio.video,
+            fps=env.VIDEO_FPS,
+            max_frames=env.VIDEO_MAX_FRAMES,
+            keyframes=env.VIDEO_KEYFRAMES,
+        )
+        if not len(frames):
+            raise ValueError("video has no frames")
+
+        inputs = frames_to_tensor(frames, self.device)
+
+        video_embedding = (
+            self._imagebind_batchers[VISION_MODALITY](inputs).cpu().numpy()
+        )
+        self._cache.put("video", audio.digest, video_embedding)
+
+        return video_embedding
+
+    def _extract_text_embedding(self, text) -> np.ndarray:
         """
         Извлекает эмбеддинг для текста.
 
@@ -191,15 +362,15 @@ class MlService:
 
         Возвращает
         -------
-        torch.Tensor
+        numpy.ndarray
             Эмбеддинг текста, полученный с помощью модели ImageBind.
 
         Примечания
         ---------
         Функция использует метод `load_and_transform_text` для предварительной обработки текста,
         приводя его в формат, подходящий для обработки моделью. Затем эмбеддинг извлекается
-        в режиме inference, что позволяет выполнять вычисления без сохранения промежуточных
-        данных для обучения.
+        в режиме inference через микробатчер, который объединяет одновременные запросы
+        в один прямой проход модели. Результат кэшируется по хэшу текста.
 
         Исключения
         ---------
@@ -209,9 +380,19 @@ class MlService:
         """
         if not isinstance(text, str) or not text:
             text = "<UNK>"
-        inputs = {ModalityType.TEXT: data.load_and_transform_text([text], self.device)}
-        with torch.inference_mode():
-            text_embedding = self._imagebind_model(inputs)[ModalityType.TEXT]
+
+        key = content_digest(text)
+        text_embedding = self._cache.get("text", key)
+        if text_embedding is not None:
+            return text_embedding
+
+        from imagebind.utils import data
+
+        inputs = data.load_and_transform_text([text], self.device)
+
+        text_embedding = self._imagebind_batchers[TEXT_MODALITY](inputs).cpu().numpy()
+        self._cache.put("text", key, text_embedding)
+
         return text_embedding
 
     def _generate_prompt(self, traits: dict) -> str:
@@ -240,8 +421,7 @@ class MlService:
           и формировать релевантные результаты.
         """
         prompt = (
-            f"У кандидата следующие показатели личности:\n"
-            f"- Экстраверсия: {traits['extraversion']}\n"
+            f"{ADVICE_PROMPT_PREFIX} {traits['extraversion']}\n"
             f"- Нейротизм: {traits['neuroticism']}\n"
             f"- Доброжелательность: {traits['agreeableness']}\n"
             f"- Сознательность: {traits['conscientiousness']}\n"
@@ -251,52 +431,41 @@ class MlService:
         )
         return prompt
 
-    def generate_advice(self, traits, max_length=150) -> str:
+    def generate_advice(self, traits) -> tuple[str, str]:
         """
         Генерирует краткие рекомендации по работе на основе личностных показателей.
 
         Параметры
         ----------
-        traits : list
-            Список строк, представляющих личностные характеристики или черты,
-            которые будут использоваться для создания текста рекомендации.
-        max_length : int, optional
-            Максимальная длина генерируемого текста в символах (по умолчанию 150).
+        traits : dict
+            Словарь личностных характеристик, из которых строится промпт
+            (см. `_generate_prompt`).
 
         Возвращает
         -------
-        str
+        tuple[str, str]
             Сгенерированный текст с рекомендацией, содержащий описание действий
-            или советов, основанных на личностных характеристиках. Текст возвращается
-            в виде строки без специальных токенов, только основная часть.
+            или советов, основанных на личностных характеристиках, без специальных
+            токенов и без промпта, и сам промпт, который сохраняется вместе с советом.
 
         Примечания
         ---------
-        - Для генерации текста используется предварительно обученная модель языковой
-          генерации.
-        - Функция обрабатывает промпт с помощью токенизатора и модели, которая
-          генерирует текст по заданным параметрам.
-        - Выходной текст очищается от исходного промпта и возвращается только
-          сгенерированная часть.
+        - Промпт передаётся в `AdviceGenerator`, который объединяет одновременные
+          запросы в один пакет и переиспользует KV-кэш общего начала промпта.
+        - Длина ответа ограничена `ADVICE_MAX_NEW_TOKENS` новыми токенами и не
+          зависит от длины промпта.
         """
         prompt = self._generate_prompt(traits)
-        input_ids = self._bert_tokenizer.encode(prompt, return_tensors='pt').to(device)
-
-        output = self._bert_model.generate(
-            input_ids,
-            max_length=max_length,
-            num_return_sequences=1,
-            no_repeat_ngram_size=3,
-            do_sample=True,
-            top_k=10,
-            top_p=0.8,
-            temperature=0.5,
-            eos_token_id=self._bert_tokenizer.eos_token_id,
-            pad_token_id=self._bert_tokenizer.pad_token_id
-        )
+        advice = self._advice_generator(prompt)
+        return advice, prompt
+
+    def generation_stats(self) -> dict[str, float]:
+        """Возвращает счётчики генерации советов текущего процесса, в том числе токены в секунду."""
+        return self._advice_generator.stats()
+
+
+ml_executor = MlExecutor(MlService, env.ML_PROCESSES)
+
 
-        generated_text = self._bert_tokenizer.decode(output[0], skip_special_tokens=True)
-        # Удаляем исходный промпт из сгенерированного текста
-        advice = generated_text[len(prompt):].strip()
-        # Оставляем только первую часть до точки или переноса строки
-        return advice
+def get_ml_executor() -> MlExecutor:
+    yield ml_executor
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Sequence
 
 from fastapi.params import Depends
 from loguru import logger
@@ -27,6 +27,29 @@ class PersonalityModelService:
 
         return self._personality_mode_repo_ro_schema(personality_model)
 
+    async def create_many(
+        self, opts: List[CreatePersonalityModel], commit: bool = True
+    ) -> List[PersonalityModelSchema]:
+        logger.debug("PersonalityModel - Service - create_many")
+        personality_models = await self._repo.create_many(
+            [
+                dict(
+                    model=opt.model,
+                    parameter=opt.parameter,
+                    confidence=opt.confidence,
+                    vacancy=opt.vacancy,
+                    card=opt.card,
+                )
+                for opt in opts
+            ],
+            commit=commit,
+        )
+
+        return [
+            self._personality_mode_repo_ro_schema(personality_model)
+            for personality_model in personality_models
+        ]
+
     async def get_by_card_id(self, card_id) -> List[PersonalityModelSchema]:
         logger.debug("PersonalityModel - Service - get_by_card_id")
         personality_models = await self._repo.get_by_card_id(card_id)
@@ -45,6 +68,14 @@ class PersonalityModelService:
             for personality_model in personality_models
         ]
 
+    def to_schemas(
+        self, personality_models: Sequence[PersonalityModel]
+    ) -> List[PersonalityModelSchema]:
+        return [
+            self._personality_mode_repo_ro_schema(personality_model)
+            for personality_model in personality_models
+        ]
+
     def _personality_mode_repo_ro_schema(
         self, req: PersonalityModel
     ) -> PersonalityModelSchema:
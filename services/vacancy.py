@@ -1,12 +1,14 @@
-from typing import List
+from typing import List, Sequence
 
 from fastapi import Depends
 from loguru import logger
 
+from models.personality_model import PersonalityModel
 from models.vacancy import Vacancy
 from repositories.vacancy import VacancyRepository
 from schemas.vacancy import CreateVacancyOpts, VacancySchema, ListVacancyOpts
 from services.personality_model import PersonalityModelService
+from utils.pagination import decode_cursor
 
 
 class VacancyService:
@@ -24,19 +26,28 @@ class VacancyService:
             Vacancy(title=opts.title, description=opts.description, salary=opts.salary)
         )
 
-        return await self._vacancy_repo_to_schema(vacancy)
+        # у только что созданной вакансии моделей личности ещё нет
+        return self._vacancy_repo_to_schema(vacancy, [])
 
     async def list(self, opts: ListVacancyOpts) -> List[VacancySchema]:
         logger.debug("Service - Vacancy - list")
-        vacancies = await self._repo.list(opts)
+        after = decode_cursor(opts.cursor) if opts.cursor else None
+        vacancies = await self._repo.list(opts, after)
 
-        return [await self._vacancy_repo_to_schema(vacancy) for vacancy in vacancies]
+        return [
+            self._vacancy_repo_to_schema(vacancy, vacancy.personality_models)
+            for vacancy in vacancies
+        ]
 
-    async def _vacancy_repo_to_schema(self, req: Vacancy) -> VacancySchema:
+    def _vacancy_repo_to_schema(
+        self, req: Vacancy, personality_models: Sequence[PersonalityModel]
+    ) -> VacancySchema:
         return VacancySchema(
             id=req.id,
             title=req.title,
             description=req.description,
             salary=req.salary,
-            personality_models=await self._pm_service.get_by_vacancy_id(req.id),
+            personality_models=self._pm_service.to_schemas(personality_models),
+            created_at=req.created_at,
+            updated_at=req.updated_at,
         )
@@ -0,0 +1,63 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+from torch import nn  # noqa: E402
+
+from ml.precision import _replace_linear_like  # noqa: E402
+
+
+def _whisper_class(name: str, base: type) -> type:
+    # классы с тем же модулем, что у whisper, без зависимости от самого whisper
+    return type(name, (base,), {"__module__": "whisper.model"})
+
+
+WhisperLinear = _whisper_class("Linear", nn.Linear)
+WhisperLayerNorm = _whisper_class("LayerNorm", nn.LayerNorm)
+WhisperConv1d = _whisper_class("Conv1d", nn.Conv1d)
+
+
+class AudioEncoder(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.conv = WhisperConv1d(4, 4, 3)
+        self.ln = WhisperLayerNorm(4)
+        self.proj = WhisperLinear(4, 8)
+
+
+AudioEncoder.__module__ = "whisper.model"
+
+
+class Whisper(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.encoder = AudioEncoder()
+        self.head = nn.Linear(8, 2)
+
+
+Whisper.__module__ = "whisper.model"
+
+
+def test_replace_linear_like_only_touches_whisper_linear():
+    model = Whisper()
+    weight = model.encoder.proj.weight
+
+    _replace_linear_like(model)
+
+    assert type(model.encoder) is AudioEncoder
+    assert type(model.encoder.conv) is WhisperConv1d
+    assert type(model.encoder.ln) is WhisperLayerNorm
+    assert type(model.encoder.proj) is nn.Linear
+    assert model.encoder.proj.weight is weight
+    assert type(model.head) is nn.Linear
+
+
+def test_replaced_whisper_linear_keeps_output():
+    model = Whisper()
+    x = torch.randn(3, 4)
+    with torch.no_grad():
+        expected = model.encoder.proj(x)
+
+    _replace_linear_like(model)
+
+    with torch.no_grad():
+        assert torch.allclose(model.encoder.proj(x), expected)
@@ -1,6 +1,53 @@
+import argparse
+import fcntl
+import itertools
+import json
+import os
+import tempfile
+import threading
+
 import pandas as pd
 import numpy as np
-from typing import Dict, Tuple
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+
+from ml.constants import PERSONALITY_STATISTICS_PATH
+
+TRAITS = [
+    "extraversion",
+    "neuroticism",
+    "agreeableness",
+    "conscientiousness",
+    "openness",
+]
+
+# буквы полюсов MBTI: (балл >= 0, балл < 0)
+MBTI_LETTERS = {"IE": ("E", "I"), "SN": ("N", "S"), "TF": ("F", "T"), "JP": ("J", "P")}
+
+
+def _correlation_matrix(correlations: Dict[str, Dict[str, float]]) -> np.ndarray:
+    """Собирает матрицу (черты OCEAN × измерения) из вложенного словаря корреляций."""
+    matrix = np.zeros((len(TRAITS), len(correlations)))
+    for j, traits in enumerate(correlations.values()):
+        for trait, weight in traits.items():
+            matrix[TRAITS.index(trait), j] = weight
+    return matrix
+
+
+def _mbti_types(dimensions: List[str]) -> np.ndarray:
+    """Перечисляет типы MBTI так, что номер типа — биты «балл < 0» по измерениям."""
+    return np.array(
+        [
+            "".join(
+                MBTI_LETTERS[dimension][bit] for dimension, bit in zip(dimensions, bits)
+            )
+            for bits in itertools.product((0, 1), repeat=len(dimensions))
+        ]
+    )
+
+
+def _holland_codes(types: List[str]) -> np.ndarray:
+    """Перечисляет все упорядоченные тройки типов RIASEC по номеру i * n² + j * n + k."""
+    return np.array(["".join(code) for code in itertools.product(types, repeat=3)])
 
 
 class PersonalityConverter:
@@ -23,8 +70,6 @@ class PersonalityConverter:
         Коэффициенты корреляции для измерений MBTI из работы McCrae и Costa (1989).
     RIASEC_CORRELATIONS : dict
         Коэффициенты корреляции для типов RIASEC из работы De Fruyt и Mervielde (1997).
-    data : pd.DataFrame
-        DataFrame с оценками черт OCEAN.
     trait_means : dict
         Средние значения для каждой черты OCEAN.
     trait_stds : dict
@@ -85,59 +130,241 @@ class PersonalityConverter:
         },
     }
 
-    def __init__(self, data: pd.DataFrame):
+    MBTI_DIMENSIONS = list(MBTI_CORRELATIONS)
+    RIASEC_TYPES = list(RIASEC_CORRELATIONS)
+
+    # все 16 типов MBTI и все тройки RIASEC заранее: тип пакета выбирается
+    # индексированием, без сборки строк по символу
+    MBTI_TYPES = _mbti_types(MBTI_DIMENSIONS)
+    HOLLAND_CODES = _holland_codes(RIASEC_TYPES)
+
+    # корреляции MBTI и RIASEC в одной матрице (5 × 10): оба расчёта —
+    # одно матричное произведение
+    CORRELATION_MATRIX = np.hstack(
+        [
+            _correlation_matrix(MBTI_CORRELATIONS),
+            _correlation_matrix(RIASEC_CORRELATIONS),
+        ]
+    )
+
+    def __init__(
+        self,
+        data: pd.DataFrame | None = None,
+        trait_means: Mapping[str, float] | None = None,
+        trait_stds: Mapping[str, float] | None = None,
+        count: int = 0,
+    ):
         """
-        Инициализация PersonalityConverter с данными оценок OCEAN.
+        Инициализация PersonalityConverter по данным оценок OCEAN или по готовой статистике.
 
         Parameters:
         -----------
-        data : pd.DataFrame
+        data : pd.DataFrame, optional
             DataFrame с оценками черт OCEAN, содержащий столбцы:
             'extraversion', 'neuroticism', 'agreeableness', 'conscientiousness', 'openness'.
+        trait_means : Mapping[str, float], optional
+            Средние значения черт; используются, если `data` не передан.
+        trait_stds : Mapping[str, float], optional
+            Стандартные отклонения черт; используются, если `data` не передан.
+        count : int, optional
+            Число оценок, по которым посчитана статистика; задаёт её вес при `update`.
         """
-        self.data = data[
-            [
-                "extraversion",
-                "neuroticism",
-                "agreeableness",
-                "conscientiousness",
-                "openness",
-            ]
-        ]
-        self.trait_means, self.trait_stds = self._calculate_trait_statistics()
+        if data is not None:
+            data = data[TRAITS]
+            trait_means, trait_stds = self._calculate_trait_statistics(data)
+            count = len(data)
+        if trait_means is None or trait_stds is None:
+            raise ValueError("either data or trait statistics must be provided")
+
+        self.count = int(count)
+        self._mean = np.array(
+            [trait_means[trait] for trait in TRAITS], dtype=np.float64
+        )
+        stds = np.array([trait_stds[trait] for trait in TRAITS], dtype=np.float64)
+        # сумма квадратов отклонений (M2 в алгоритме Уэлфорда)
+        self._m2 = stds**2 * self.count
+        self._stds = stds
+        self._sync_statistics()
 
-    def _calculate_trait_statistics(self) -> Tuple[Dict[str, float], Dict[str, float]]:
+    @staticmethod
+    def _calculate_trait_statistics(
+        data: pd.DataFrame,
+    ) -> Tuple[Dict[str, float], Dict[str, float]]:
         """Вычисляет средние значения и стандартные отклонения для каждой черты OCEAN."""
-        means = self.data.mean().to_dict()
-        stds = self.data.std(
+        means = data.mean().to_dict()
+        stds = data.std(
             ddof=0
         ).to_dict()  # Стандартное отклонение по генеральной совокупности
         return means, stds
 
-    def _standardize_scores(self, raw_scores: Dict[str, float]) -> Dict[str, float]:
-        """Стандартизирует исходные оценки OCEAN до Z-оценок."""
-        return {
-            trait: (raw_scores[trait] - self.trait_means[trait])
-            / self.trait_stds[trait]
-            for trait in raw_scores
-        }
+    def _sync_statistics(self) -> None:
+        """Обновляет словари `trait_means` и `trait_stds` по накопленной статистике."""
+        self.trait_means = dict(zip(TRAITS, self._mean.tolist()))
+        self.trait_stds = dict(zip(TRAITS, self._stds.tolist()))
+
+    def update(self, scores: np.ndarray) -> None:
+        """
+        Добавляет в статистику новые оценки OCEAN без пересчёта по всем данным.
+
+        Пакет объединяется с накопленными count, mean и M2 по формуле Чана
+        (обобщение алгоритма Уэлфорда на пакеты), что численно устойчиво и не
+        требует хранить прежние оценки.
+
+        Parameters:
+        -----------
+        scores : np.ndarray
+            Оценки OCEAN формы (N, 5) в порядке `TRAITS`.
+        """
+        scores = np.asarray(scores, dtype=np.float64).reshape(-1, len(TRAITS))
+        n = len(scores)
+        if n == 0:
+            return
+
+        batch_mean = scores.mean(axis=0)
+        batch_m2 = ((scores - batch_mean) ** 2).sum(axis=0)
 
-    def _calculate_dimension_scores(
-        self, z_scores: Dict[str, float], correlations: Dict[str, Dict[str, float]]
-    ) -> Dict[str, float]:
-        """Рассчитывает баллы для каждого измерения на основе Z-оценок и коэффициентов корреляции."""
+        total = self.count + n
+        delta = batch_mean - self._mean
+        self._mean = self._mean + delta * n / total
+        self._m2 = self._m2 + batch_m2 + delta**2 * self.count * n / total
+        self.count = total
+
+        self._stds = np.sqrt(self._m2 / self.count)
+        self._sync_statistics()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Возвращает статистику, по которой конвертер можно восстановить без исходных данных."""
         return {
-            dimension: sum(
-                z_scores.get(trait, 0) * weight for trait, weight in traits.items()
-            )
-            for dimension, traits in correlations.items()
+            "count": self.count,
+            "trait_means": dict(self.trait_means),
+            "trait_stds": dict(self.trait_stds),
         }
 
-    def _normalize_scores(self, dimension_scores: Dict[str, float]) -> Dict[str, float]:
+    @classmethod
+    def from_dict(cls, statistics: Mapping[str, Any]) -> "PersonalityConverter":
+        """Создаёт конвертер по результату `to_dict`."""
+        return cls(
+            trait_means=statistics["trait_means"],
+            trait_stds=statistics["trait_stds"],
+            count=statistics.get("count", 0),
+        )
+
+    def save(self, path: str) -> None:
+        """Атомарно сохраняет статистику в JSON: читатели видят либо старый, либо новый файл."""
+        directory = os.path.dirname(path) or "."
+        with tempfile.NamedTemporaryFile(
+            "w", dir=directory, suffix=".tmp", delete=False
+        ) as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(f.name, path)
+
+    @classmethod
+    def load(cls, path: str) -> "PersonalityConverter":
+        """Загружает конвертер из JSON, сохранённого `save`."""
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def _to_matrix(self, raw_scores: Mapping[str, float]) -> np.ndarray:
+        # отсутствующая черта заменяется средним, то есть даёт нулевую Z-оценку
+        return np.array(
+            [[raw_scores.get(trait, self.trait_means[trait]) for trait in TRAITS]]
+        )
+
+    def dimension_scores(self, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Рассчитывает ненормализованные баллы измерений MBTI и RIASEC для пакета оценок.
+
+        Parameters:
+        -----------
+        scores : np.ndarray
+            Оценки OCEAN формы (N, 5) в порядке `TRAITS`.
+
+        Returns:
+        --------
+        mbti_scores : np.ndarray
+            Баллы формы (N, 4) в порядке `MBTI_DIMENSIONS`.
+        riasec_scores : np.ndarray
+            Баллы формы (N, 6) в порядке `RIASEC_TYPES`.
+        """
+        deviations = np.asarray(scores, dtype=np.float64) - self._mean
+        # черта без разброса не влияет на баллы, а не делит на ноль; черта,
+        # равная среднему, даёт ровно нулевую Z-оценку
+        z_scores = np.divide(
+            deviations,
+            self._stds,
+            out=np.zeros_like(deviations),
+            where=self._stds > 0,
+        )
+        dimensions = z_scores @ self.CORRELATION_MATRIX
+        split = len(self.MBTI_DIMENSIONS)
+        return dimensions[:, :split], dimensions[:, split:]
+
+    @staticmethod
+    def _normalize(dimension_scores: np.ndarray) -> np.ndarray:
         """Нормализует баллы измерений в диапазоне от 0 до 1 с использованием логистической функции."""
-        return {
-            dim: 1 / (1 + np.exp(-score)) for dim, score in dimension_scores.items()
-        }
+        return 1 / (1 + np.exp(-dimension_scores))
+
+    def calculate_mbti_batch(self, scores: np.ndarray) -> Tuple[List[str], np.ndarray]:
+        """
+        Вычисляет типы MBTI и нормализованные баллы измерений для пакета оценок.
+
+        Parameters:
+        -----------
+        scores : np.ndarray
+            Оценки OCEAN формы (N, 5) в порядке `TRAITS`.
+
+        Returns:
+        --------
+        mbti_types : list[str]
+            Предполагаемые типы MBTI.
+        normalized_scores : np.ndarray
+            Нормализованные баллы формы (N, 4) в порядке `MBTI_DIMENSIONS`.
+        """
+        mbti_scores, _ = self.dimension_scores(scores)
+        return self._assign_mbti_types(mbti_scores), self._normalize(mbti_scores)
+
+    def calculate_riasec_batch(
+        self, scores: np.ndarray
+    ) -> Tuple[List[str], np.ndarray]:
+        """
+        Вычисляет коды Холланда (RIASEC) и нормализованные баллы для пакета оценок.
+
+        Parameters:
+        -----------
+        scores : np.ndarray
+            Оценки OCEAN формы (N, 5) в порядке `TRAITS`.
+
+        Returns:
+        --------
+        holland_codes : list[str]
+            Коды Холланда из топ-3 типов RIASEC.
+        normalized_scores : np.ndarray
+            Нормализованные баллы формы (N, 6) в порядке `RIASEC_TYPES`.
+        """
+        _, riasec_scores = self.dimension_scores(scores)
+        normalized_scores = self._normalize(riasec_scores)
+        return self._assign_holland_codes(normalized_scores), normalized_scores
+
+    def calculate_batch(
+        self, scores: np.ndarray
+    ) -> Tuple[List[str], np.ndarray, List[str], np.ndarray]:
+        """
+        Вычисляет MBTI и RIASEC за одно матричное произведение.
+
+        Returns:
+        --------
+        tuple
+            (mbti_types, mbti_scores, holland_codes, riasec_scores), как в
+            `calculate_mbti_batch` и `calculate_riasec_batch`.
+        """
+        mbti_scores, riasec_scores = self.dimension_scores(scores)
+        riasec_normalized = self._normalize(riasec_scores)
+        return (
+            self._assign_mbti_types(mbti_scores),
+            self._normalize(mbti_scores),
+            self._assign_holland_codes(riasec_normalized),
+            riasec_normalized,
+        )
 
     def calculate_mbti(
         self, raw_scores: Dict[str, float]
@@ -157,22 +384,18 @@ class PersonalityConverter:
         normalized_scores : dict
             Нормализованные баллы измерений от 0 до 1.
         """
-        z_scores = self._standardize_scores(raw_scores)
-        dimension_scores = self._calculate_dimension_scores(
-            z_scores, self.MBTI_CORRELATIONS
+        mbti_types, normalized_scores = self.calculate_mbti_batch(
+            self._to_matrix(raw_scores)
         )
-        normalized_scores = self._normalize_scores(dimension_scores)
-        mbti_type = self._assign_mbti_type(dimension_scores)
-        return mbti_type, normalized_scores
-
-    def _assign_mbti_type(self, dimension_scores: Dict[str, float]) -> str:
-        """Присваивает тип MBTI на основе баллов измерений."""
-        mbti = ""
-        mbti += "E" if dimension_scores.get("IE", 0) >= 0 else "I"
-        mbti += "N" if dimension_scores.get("SN", 0) >= 0 else "S"
-        mbti += "F" if dimension_scores.get("TF", 0) >= 0 else "T"
-        mbti += "J" if dimension_scores.get("JP", 0) >= 0 else "P"
-        return mbti
+        return mbti_types[0], dict(
+            zip(self.MBTI_DIMENSIONS, normalized_scores[0].tolist())
+        )
+
+    def _assign_mbti_types(self, mbti_scores: np.ndarray) -> List[str]:
+        """Присваивает типы MBTI на основе знаков баллов измерений."""
+        # знаки четырёх измерений — биты номера типа в MBTI_TYPES
+        bits = (mbti_scores < 0) @ (1 << np.arange(len(self.MBTI_DIMENSIONS))[::-1])
+        return self.MBTI_TYPES[bits].tolist()
 
     def calculate_riasec(
         self, raw_scores: Dict[str, float]
@@ -192,38 +415,97 @@ class PersonalityConverter:
         normalized_scores : dict
             Нормализованные баллы для каждого типа RIASEC от 0 до 1.
         """
-        z_scores = self._standardize_scores(raw_scores)
-        riasec_scores = self._calculate_dimension_scores(
-            z_scores, self.RIASEC_CORRELATIONS
+        holland_codes, normalized_scores = self.calculate_riasec_batch(
+            self._to_matrix(raw_scores)
         )
-        normalized_scores = self._normalize_scores(riasec_scores)
-        # Сортируем баллы по убыванию
-        sorted_types = sorted(
-            normalized_scores.items(), key=lambda item: item[1], reverse=True
+        return holland_codes[0], dict(
+            zip(self.RIASEC_TYPES, normalized_scores[0].tolist())
         )
-        # Формируем код Холланда из топ-3 типов
-        holland_code = "".join([item[0] for item in sorted_types[:3]])
-        return holland_code, normalized_scores
 
+    def _assign_holland_codes(self, normalized_scores: np.ndarray) -> List[str]:
+        """Формирует коды Холланда из трёх типов с наибольшими баллами."""
+        # устойчивая сортировка по убыванию сохраняет порядок RIASEC при равенстве
+        top = np.argsort(-normalized_scores, axis=1, kind="stable")[:, :3]
+        n = len(self.RIASEC_TYPES)
+        return self.HOLLAND_CODES[(top[:, 0] * n + top[:, 1]) * n + top[:, 2]].tolist()
+
+
+_converter_lock = threading.Lock()
+_converter: Tuple[int, PersonalityConverter] | None = None
+
+
+def get_personality_converter(
+    path: str = PERSONALITY_STATISTICS_PATH,
+) -> PersonalityConverter | None:
+    """
+    Возвращает конвертер, загруженный из артефакта статистики, или None, если артефакта нет.
+
+    Конвертер кэшируется в процессе и перечитывается, только когда файл
+    изменился, поэтому обновления статистики из воркера подхватываются API
+    без перезапуска, а запрос стоит одного `os.stat`. Пока воркер не записал
+    статистику в `path`, используется исходный артефакт из образа.
+    """
+    global _converter
+
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        if path == PERSONALITY_STATISTICS_PATH:
+            return None
+        return get_personality_converter(PERSONALITY_STATISTICS_PATH)
+
+    with _converter_lock:
+        if _converter is None or _converter[0] != mtime:
+            _converter = (mtime, PersonalityConverter.load(path))
+        return _converter[1]
+
+
+def update_personality_statistics(
+    scores: Sequence[Mapping[str, float]], path: str = PERSONALITY_STATISTICS_PATH
+) -> None:
+    """
+    Добавляет оценки OCEAN в артефакт статистики.
+
+    Файл перечитывается и перезаписывается под блокировкой, поэтому
+    несколько процессов воркера не теряют обновления друг друга. Первое
+    обновление продолжает исходный артефакт из образа.
+    """
+    if not os.path.exists(path) and not os.path.exists(PERSONALITY_STATISTICS_PATH):
+        return
+
+    matrix = np.array([[score[trait] for trait in TRAITS] for score in scores])
+    with open(f"{path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        source = path if os.path.exists(path) else PERSONALITY_STATISTICS_PATH
+        converter = PersonalityConverter.load(source)
+        converter.update(matrix)
+        converter.save(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Fit OCEAN statistics for PersonalityConverter and save them."
+    )
+    parser.add_argument(
+        "data", help="CSV with OCEAN columns, e.g. processed_data/train.csv"
+    )
+    parser.add_argument(
+        "--output", default=PERSONALITY_STATISTICS_PATH, help="where to save the JSON"
+    )
+    args = parser.parse_args()
 
-# Пример использования
-if __name__ == "__main__":
     # Загрузка данных из CSV файла
-    data = pd.read_csv("processed_data/train.csv")  # Замените на путь к вашему файлу
+    data = pd.read_csv(args.data)
 
     # Проверка наличия необходимых столбцов в данных
-    required_columns = {
-        "extraversion",
-        "neuroticism",
-        "agreeableness",
-        "conscientiousness",
-        "openness",
-    }
+    required_columns = set(TRAITS)
     if not required_columns.issubset(data.columns):
         raise ValueError(f"Data must contain the following columns: {required_columns}")
 
-    # Создание экземпляра PersonalityConverter
+    # Статистика считается один раз и сохраняется рядом с моделями
     converter = PersonalityConverter(data)
+    converter.save(args.output)
+    print(f"Статистика по {converter.count} оценкам сохранена в {args.output}")
 
     # Пример оценок OCEAN для индивида
     ocean_scores = {
@@ -247,3 +529,7 @@ if __name__ == "__main__":
     print("Нормализованные баллы RIASEC:")
     for r_type, score in riasec_scores.items():
         print(f"{r_type}: {score:.4f}")
+
+
+if __name__ == "__main__":
+    main()
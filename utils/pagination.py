@@ -0,0 +1,50 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Sequence
+
+from sqlalchemy import Select, tuple_
+
+from errors.errors import ErrBadRequest
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+Cursor = tuple[datetime, uuid.UUID]
+
+
+def encode_cursor(created_at: datetime, id: uuid.UUID) -> str:
+    """Кодирует позицию последнего элемента страницы в непрозрачный токен."""
+    payload = json.dumps([created_at.isoformat(), str(id)]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), uuid.UUID(id)
+    except (ValueError, TypeError):
+        raise ErrBadRequest("invalid cursor")
+
+
+def next_cursor(items: Sequence[Any], limit: int) -> str | None:
+    """Возвращает курсор следующей страницы или None, если страница последняя."""
+    if len(items) < limit or not items:
+        return None
+
+    last = items[-1]
+    return encode_cursor(last.created_at, last.id)
+
+
+def keyset(query: Select, model: Any, after: Cursor | None) -> Select:
+    """
+    Сортирует выборку от новых к старым по (created_at, id) и продолжает её после курсора.
+
+    Сравнение кортежей обслуживается составным индексом (created_at, id),
+    поэтому глубокие страницы стоят столько же, сколько первая.
+    """
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    if after is not None:
+        query = query.where(tuple_(model.created_at, model.id) < tuple_(*after))
+    return query
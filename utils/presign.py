@@ -0,0 +1,126 @@
+import hashlib
+import hmac
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Sequence
+from urllib.parse import quote
+
+
+class PresignedUrlSigner:
+    """
+    Подписывает GET-ссылки на объекты S3/MinIO по AWS Signature V4 локально, без обращений к серверу.
+
+    В отличие от `Minio.get_presigned_url`, не запрашивает регион бакета по сети,
+    подписывает целую страницу объектов одной меткой времени и одним ключом
+    подписи и кэширует готовые ссылки, пока до их истечения остаётся больше
+    `refresh_margin`.
+
+    Attributes:
+    -----------
+    expires : timedelta
+        Время жизни выдаваемых ссылок.
+    refresh_margin : timedelta
+        За сколько до истечения ссылка перестаёт выдаваться из кэша.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        access_key: str,
+        secret_key: str,
+        region: str = "us-east-1",
+        secure: bool = True,
+        expires: timedelta = timedelta(days=7),
+        refresh_margin: timedelta = timedelta(hours=1),
+        max_cached: int = 100_000,
+    ):
+        self._host = host
+        self._access_key = access_key
+        self._secret_key = secret_key
+        self._region = region
+        self._scheme = "https" if secure else "http"
+        self.expires = expires
+        self.refresh_margin = refresh_margin
+        self._max_cached = max_cached
+
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[tuple[str, str], tuple[str, datetime]] = OrderedDict()
+        self._signing_keys: dict[str, bytes] = {}
+
+    def sign(self, bucket: str, object_path: str) -> str:
+        return self.sign_many(bucket, [object_path])[0]
+
+    def sign_many(self, bucket: str, object_paths: Sequence[str]) -> list[str]:
+        now = datetime.now(timezone.utc)
+        urls = []
+        with self._lock:
+            for object_path in object_paths:
+                key = (bucket, object_path)
+                cached = self._cache.get(key)
+                if cached is not None and cached[1] - self.refresh_margin > now:
+                    self._cache.move_to_end(key)
+                    urls.append(cached[0])
+                    continue
+
+                url = self._presign(bucket, object_path, now)
+                self._cache[key] = (url, now + self.expires)
+                if len(self._cache) > self._max_cached:
+                    self._cache.popitem(last=False)
+                urls.append(url)
+
+        return urls
+
+    def _signing_key(self, date_stamp: str) -> bytes:
+        # ключ зависит только от даты, поэтому считается раз в сутки
+        signing_key = self._signing_keys.get(date_stamp)
+        if signing_key is None:
+            signing_key = f"AWS4{self._secret_key}".encode()
+            for part in (date_stamp, self._region, "s3", "aws4_request"):
+                signing_key = hmac.new(signing_key, part.encode(), hashlib.sha256).digest()
+            self._signing_keys = {date_stamp: signing_key}
+        return signing_key
+
+    def _presign(self, bucket: str, object_path: str, now: datetime) -> str:
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        date_stamp = now.strftime("%Y%m%d")
+        scope = f"{date_stamp}/{self._region}/s3/aws4_request"
+
+        canonical_uri = quote(f"/{bucket}/{object_path}", safe="/~")
+        query = {
+            "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+            "X-Amz-Credential": f"{self._access_key}/{scope}",
+            "X-Amz-Date": amz_date,
+            "X-Amz-Expires": str(int(self.expires.total_seconds())),
+            "X-Amz-SignedHeaders": "host",
+        }
+        canonical_query = "&".join(
+            f"{quote(k, safe='~')}={quote(v, safe='~')}" for k, v in sorted(query.items())
+        )
+
+        canonical_request = "\n".join(
+            [
+                "GET",
+                canonical_uri,
+                canonical_query,
+                f"host:{self._host}\n",
+                "host",
+                "UNSIGNED-PAYLOAD",
+            ]
+        )
+        string_to_sign = "\n".join(
+            [
+                "AWS4-HMAC-SHA256",
+                amz_date,
+                scope,
+                hashlib.sha256(canonical_request.encode()).hexdigest(),
+            ]
+        )
+        signature = hmac.new(
+            self._signing_key(date_stamp), string_to_sign.encode(), hashlib.sha256
+        ).hexdigest()
+
+        return (
+            f"{self._scheme}://{self._host}{canonical_uri}"
+            f"?{canonical_query}&X-Amz-Signature={signature}"
+        )
@@ -0,0 +1,225 @@
+import asyncio
+import itertools
+import sqlite3
+import time
+from typing import Protocol
+
+# сколько секунд хранятся события каналов; подписчик, пришедший позже,
+# узнаёт итог задачи из базы
+EVENT_TTL = 3600
+
+
+class Broker(Protocol):
+    # воркер, запущенный внутри процесса API, видит очередь только в этом процессе
+    in_process: bool
+
+    async def enqueue(self, payload: str) -> None: ...
+
+    async def dequeue(self, timeout: float) -> str | None: ...
+
+    async def publish(self, channel: str, payload: str) -> None: ...
+
+    async def read(
+        self, channel: str, after: int, timeout: float
+    ) -> list[tuple[int, str]]:
+        """
+        Возвращает события канала с номером больше `after`, ожидая их не дольше `timeout`.
+
+        События хранятся `EVENT_TTL` секунд, поэтому подписчик получает и
+        опубликованные до подписки.
+        """
+        ...
+
+
+class InMemoryBroker:
+    """
+    Очередь задач внутри одного процесса. Используется в тестах и при локальной
+    разработке: воркеры запускаются в том же event loop, что и API.
+    """
+
+    in_process = True
+
+    def __init__(self):
+        self._queue: asyncio.Queue[str] | None = None
+        self._events: dict[str, list[tuple[int, float, str]]] = {}
+        self._ids = itertools.count(1)
+        self._changed: asyncio.Event | None = None
+
+    @property
+    def queue(self) -> asyncio.Queue[str]:
+        # очередь создаётся лениво, чтобы привязаться к работающему event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        return self._queue
+
+    async def enqueue(self, payload: str) -> None:
+        await self.queue.put(payload)
+
+    async def dequeue(self, timeout: float) -> str | None:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    @property
+    def changed(self) -> asyncio.Event:
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        return self._changed
+
+    async def publish(self, channel: str, payload: str) -> None:
+        now = time.time()
+        for name in list(self._events):
+            events = [
+                event for event in self._events[name] if event[1] > now - EVENT_TTL
+            ]
+            if events:
+                self._events[name] = events
+            else:
+                del self._events[name]
+
+        self._events.setdefault(channel, []).append((next(self._ids), now, payload))
+
+        # ожидающие читатели будятся, следующие ждут уже новое событие
+        changed, self._changed = self.changed, asyncio.Event()
+        changed.set()
+
+    async def read(
+        self, channel: str, after: int, timeout: float
+    ) -> list[tuple[int, str]]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        while True:
+            changed = self.changed
+            events = [
+                (id, payload)
+                for id, _, payload in self._events.get(channel, [])
+                if id > after
+            ]
+            remaining = deadline - loop.time()
+            if events or remaining <= 0:
+                return events
+
+            try:
+                await asyncio.wait_for(changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return []
+
+
+class SQLiteBroker:
+    """
+    Очередь задач поверх файла SQLite. Позволяет API и отдельным процессам
+    воркеров обмениваться задачами без внешнего брокера сообщений.
+    """
+
+    in_process = False
+
+    def __init__(self, path: str, poll_interval: float = 0.5):
+        self._path = path
+        self._poll_interval = poll_interval
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS queue ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "payload TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "channel TEXT NOT NULL, "
+                "payload TEXT NOT NULL, "
+                "created_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_events_channel ON events (channel, id)"
+            )
+            # устаревшие события удаляются при каждой публикации; без индекса
+            # каждая публикация просматривала бы всю таблицу
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_events_created_at ON events (created_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._path, timeout=30, isolation_level=None)
+
+    def _put(self, payload: str) -> None:
+        with self._connect() as conn:
+            conn.execute("INSERT INTO queue (payload) VALUES (?)", (payload,))
+
+    def _take(self) -> str | None:
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE берёт блокировку на запись, поэтому одну задачу
+            # не смогут забрать два воркера одновременно
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, payload FROM queue ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute("DELETE FROM queue WHERE id = ?", (row[0],))
+            conn.execute("COMMIT")
+            return row[1]
+        finally:
+            conn.close()
+
+    def _publish(self, channel: str, payload: str) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO events (channel, payload, created_at) VALUES (?, ?, ?)",
+                (channel, payload, now),
+            )
+            conn.execute("DELETE FROM events WHERE created_at < ?", (now - EVENT_TTL,))
+
+    def _read(self, channel: str, after: int) -> list[tuple[int, str]]:
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT id, payload FROM events WHERE channel = ? AND id > ? ORDER BY id",
+                (channel, after),
+            ).fetchall()
+
+    async def enqueue(self, payload: str) -> None:
+        await asyncio.to_thread(self._put, payload)
+
+    async def dequeue(self, timeout: float) -> str | None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        while True:
+            payload = await asyncio.to_thread(self._take)
+            if payload is not None or loop.time() >= deadline:
+                return payload
+
+            await asyncio.sleep(self._poll_interval)
+
+    async def publish(self, channel: str, payload: str) -> None:
+        await asyncio.to_thread(self._publish, channel, payload)
+
+    async def read(
+        self, channel: str, after: int, timeout: float
+    ) -> list[tuple[int, str]]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        while True:
+            events = await asyncio.to_thread(self._read, channel, after)
+            if events or loop.time() >= deadline:
+                return events
+
+            await asyncio.sleep(self._poll_interval)
+
+
+def create_broker(url: str) -> Broker:
+    if url.startswith("memory://"):
+        return InMemoryBroker()
+
+    if url.startswith("sqlite:///"):
+        return SQLiteBroker(url.removeprefix("sqlite:///"))
+
+    raise ValueError(f"unsupported broker url: {url}")
@@ -0,0 +1,126 @@
+import asyncio
+import multiprocessing
+import uuid
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from configs.Broker import broker
+from configs.Database import async_session
+from configs.Environment import get_environment_variables
+from configs.Minio import minio_client, minio_executor, url_signer
+from ml.cache import get_embedding_cache
+from ml.executor import MlExecutor
+from repositories.card import CardRepository
+from repositories.job import JobRepository
+from repositories.minio import MinioRepository
+from repositories.personality_model import PersonalityModelRepository
+from schemas.job import JobKind, JobStatus
+from services.card import CardService
+from services.job import JobService
+from services.minio import MinioService
+from services.ml import ml_executor
+from services.personality_model import PersonalityModelService
+from workers.broker import Broker
+
+env = get_environment_variables()
+
+
+def _build_services(
+    db: AsyncSession, executor: MlExecutor
+) -> tuple[CardService, JobService]:
+    job_service = JobService(JobRepository(db), broker)
+    card_service = CardService(
+        repo=CardRepository(db),
+        minio=MinioService(
+            MinioRepository(minio_client, url_signer, minio_executor), env
+        ),
+        personality_model_service=PersonalityModelService(
+            PersonalityModelRepository(db)
+        ),
+        ml_executor=executor,
+        job_service=job_service,
+        config=env,
+    )
+    return card_service, job_service
+
+
+async def handle_job(id: uuid.UUID, executor: MlExecutor) -> None:
+    logger.debug(f"Worker - handle_job - {id}")
+    async with async_session() as db:
+        card_service, job_service = _build_services(db, executor)
+
+        job = await job_service.set_status(id, JobStatus.PROCESSING)
+
+        try:
+            if job.kind == JobKind.ADVICE:
+                await card_service.create_advice(job.card)
+            else:
+                await card_service.process(job.card, job.id)
+        except Exception as e:
+            logger.exception(f"job {id} failed")
+            await db.rollback()
+            await job_service.set_status(id, JobStatus.FAILED, str(e))
+            return
+
+        await job_service.set_status(id, JobStatus.DONE)
+
+        # совет генерируется отдельной задачей: оценка карточки уже доступна
+        # клиенту, а долгая генерация не задерживает её
+        if job.kind == JobKind.PROCESS:
+            await job_service.enqueue(job.card, JobKind.ADVICE)
+
+    logger.info(f"Worker - embedding cache - {get_embedding_cache().stats()}")
+    if job.kind == JobKind.ADVICE:
+        # генерация идёт там же, где модели: в этом процессе или в процессе пула
+        stats = await executor.run("generation_stats")
+        logger.info(f"Worker - advice generation - {stats}")
+
+
+async def _consume(queue: Broker, executor: MlExecutor) -> None:
+    while True:
+        payload = await queue.dequeue(timeout=1.0)
+        if payload is None:
+            continue
+
+        try:
+            await handle_job(uuid.UUID(payload), executor)
+        except Exception:
+            # задача не должна останавливать воркер, даже если упала запись статуса
+            logger.exception(f"cannot handle job {payload}")
+
+
+async def run_worker(queue: Broker = broker) -> None:
+    logger.info("Worker - started")
+    await asyncio.to_thread(ml_executor.start, env.ML_PRELOAD)
+
+    # несколько задач в одном процессе позволяют микробатчеру ImageBind
+    # объединять эмбеддинги параллельно обрабатываемых карточек, а при
+    # ML_PROCESSES > 0 — занимать все процессы пула
+    await asyncio.gather(
+        *(_consume(queue, ml_executor) for _ in range(env.CARD_WORKER_CONCURRENCY))
+    )
+
+
+def _run_process() -> None:
+    asyncio.run(run_worker())
+
+
+def main() -> None:
+    if env.CARD_WORKERS <= 1:
+        _run_process()
+        return
+
+    processes = [
+        multiprocessing.Process(target=_run_process, name=f"card-worker-{i}")
+        for i in range(env.CARD_WORKERS)
+    ]
+    for process in processes:
+        process.start()
+
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()